@@ -1,20 +1,84 @@
 # app/analyzer.py
 
-from typing import List, Dict
+import os
+import re
+import threading
+import time
+from itertools import chain, islice
+from typing import Collection, Iterator, List, Dict, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
 
-from app.utils.langutils import detect_language, translate_text_if_needed  # translate is a no-op stub now
-from app.utils.textutils import split_sentences, clean_text
-
-# Multilingual sentence embedding model
+from app.encoders import Encoder, cache_name_for, make_encoder, resolve_backend
+from app.instructions import (
+    INSTRUCTION_CLASSIFIER,
+    INSTRUCTION_PROTOTYPES_PATH,
+    INSTRUCTION_THRESHOLD,
+    InstructionClassifier,
+    load_prototypes,
+    prototypes_digest,
+)
+from app.metrics import ENCODE_BATCH_SIZE, METRICS_ENABLED, CallbackGauge, observe_request_sizes, stage
+from app.scoring import AnnCoverage, RunningCoverage, ann_available, score_coverage, score_coverage_segments
+from app.utils.batching import MicroBatcher
+from app.utils.embcache import EmbeddingCache
+from app.translation import TRANSLATION_ENABLED, translate_many, translation_enabled
+from app.utils.langutils import LANGID_BACKEND, detect_language
+from app.utils.textutils import SENT_TERMINATORS, Span, compile_fragments, iter_segments
+
+# Multilingual sentence embedding model (backend chosen by TOTEM_ENCODER_BACKEND, see app/encoders.py).
+# Loaded lazily by get_encoder(); call warmup() to load it ahead of the first request.
 EMB_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
-EMB = SentenceTransformer(EMB_MODEL_NAME)
+EMB_BACKEND = resolve_backend()
+EMB: Optional[Encoder] = None
+EMB_LOCK = threading.Lock()
+MODEL_STATE: Dict = {"loaded": False, "ready": False, "load_seconds": None, "warmup_seconds": None}
+WARMUP_SENTENCES = [
+    "Warmup.",
+    "This sentence triggers the first allocation of the encoder.",
+    "यह वाक्य मॉडल को तैयार करता है।",
+]
+
+# Cross-request micro-batching in front of EMB.encode (0 ms wait => encode directly)
+EMB_BATCH_MAX_WAIT_MS = float(os.getenv("TOTEM_EMB_BATCH_MAX_WAIT_MS", "5"))
+EMB_BATCH_MAX_SIZE = int(os.getenv("TOTEM_EMB_BATCH_MAX_SIZE", "256"))
+EMB_ENCODE_BATCH_SIZE = 32  # SentenceTransformer mini-batch size inside one encode call
+EMB_BATCHER: Optional[MicroBatcher] = None
+
+# Embedding-based instruction filter (see app/instructions.py); prototypes embedded on first use
+INSTRUCTION_CLF: Optional[InstructionClassifier] = None
+INSTRUCTION_CLF_LOCK = threading.Lock()
+
+# Sentence embedding cache (LRU size 0 => disabled; set a directory to persist across restarts)
+EMB_CACHE_SIZE = int(os.getenv("TOTEM_EMB_CACHE_SIZE", "20000"))
+EMB_CACHE_DIR = os.getenv("TOTEM_EMB_CACHE_DIR") or None
+EMB_CACHE: Optional[EmbeddingCache] = (
+    EmbeddingCache(cache_name_for(EMB_MODEL_NAME, EMB_BACKEND), max_items=EMB_CACHE_SIZE, disk_dir=EMB_CACHE_DIR)
+    if EMB_CACHE_SIZE > 0 else None
+)
+
+if EMB_CACHE is not None:
+    CallbackGauge(
+        "totem_embedding_cache_events_total", "Embedding cache lookups by outcome, and evictions",
+        lambda: {(k,): EMB_CACHE.stats()[k] for k in ("hits", "disk_hits", "misses", "evictions")},
+        labelnames=("event",), kind="counter",
+    )
+    CallbackGauge(
+        "totem_embedding_cache_hit_ratio", "Share of embedding lookups served from cache",
+        lambda: EMB_CACHE.stats()["hit_rate"],
+    )
 
 SIM_THRESHOLD = 0.55   # below this => consider that user sentence not covered
 MIN_SENT_LEN = 3       # ignore very short fragments
 MIN_AI_WORDS = 15      # if AI answer is too short, treat as low-quality
 
+# Long-document mode: responses with more sentences than this are split and encoded
+# in chunks with a running max per prompt sentence instead of one dense matrix (0 = off)
+LONG_DOC_SENTENCES = int(os.getenv("TOTEM_LONG_DOC_SENTENCES", "512"))
+LONG_DOC_CHUNK = int(os.getenv("TOTEM_LONG_DOC_CHUNK", "256"))                 # max sentences per chunk
+LONG_DOC_MEMORY_MB = float(os.getenv("TOTEM_LONG_DOC_MEMORY_MB", "64"))        # per-chunk working-set budget
+LONG_DOC_ANN_SENTENCES = int(os.getenv("TOTEM_LONG_DOC_ANN_SENTENCES", "0"))   # use a faiss ANN index above this (0 = never)
+EMB_DIM_HINT = 384  # used for chunk sizing before the encoder is loaded
+
 
 # Sentences that are just instructions like "Explain with an example"
 INSTRUCTION_FRAGMENTS = [
@@ -27,6 +91,7 @@ INSTRUCTION_FRAGMENTS = [
     "explain in detail",
     "explain step by step",
 ]
+_INSTRUCTION_RE = compile_fragments(INSTRUCTION_FRAGMENTS)
 
 
 # ------------------ Localization helpers ------------------ #
@@ -148,43 +213,198 @@ def make_summary(quality_score: float, too_short: bool, lang: str) -> str:
 
 # ------------------ Embeddings + core logic helpers ------------------ #
 
+def get_encoder() -> Encoder:
+    """
+    Return the shared encoder, loading it on first use.
+    """
+    global EMB
+    if EMB is None:
+        with EMB_LOCK:
+            if EMB is None:
+                t0 = time.perf_counter()
+                encoder = make_encoder(EMB_MODEL_NAME, EMB_BACKEND)
+                MODEL_STATE["load_seconds"] = round(time.perf_counter() - t0, 3)
+                MODEL_STATE["loaded"] = True
+                EMB = encoder
+    return EMB
+
+
+def warmup() -> Dict:
+    """
+    Load the encoder and run one dummy encode so the first real request does not
+    pay for lazy allocations. Safe to call more than once.
+    """
+    encoder = get_encoder()
+    if not MODEL_STATE["ready"]:
+        t0 = time.perf_counter()
+        encoder.encode(WARMUP_SENTENCES, batch_size=EMB_ENCODE_BATCH_SIZE)
+        detect_language(WARMUP_SENTENCES[1])  # language ID loads its profiles on first use
+        get_instruction_classifier()
+        MODEL_STATE["warmup_seconds"] = round(time.perf_counter() - t0, 3)
+        MODEL_STATE["ready"] = True
+    return dict(MODEL_STATE)
+
+
+def model_status() -> Dict:
+    return dict(MODEL_STATE, model=EMB_MODEL_NAME, backend=EMB_BACKEND)
+
+
+def _encode_batch(sentences: List[str]) -> np.ndarray:
+    if METRICS_ENABLED:
+        ENCODE_BATCH_SIZE.observe(len(sentences))
+    return get_encoder().encode(sentences, batch_size=EMB_ENCODE_BATCH_SIZE)
+
+
+def _get_emb_batcher() -> MicroBatcher:
+    global EMB_BATCHER
+    if EMB_BATCHER is None:
+        EMB_BATCHER = MicroBatcher(
+            _encode_batch,
+            max_wait_ms=EMB_BATCH_MAX_WAIT_MS,
+            max_batch_size=EMB_BATCH_MAX_SIZE,
+            gather=lambda vecs, idx: vecs[idx],
+            name="emb-batcher",
+        )
+    return EMB_BATCHER
+
+
+def _encode_uncached(groups) -> List[Optional[np.ndarray]]:
+    if EMB_BATCH_MAX_WAIT_MS <= 0:
+        return [_encode_batch(g) if g else None for g in groups]
+    batcher = _get_emb_batcher()
+    futures = [batcher.submit(g) for g in groups]
+    return [f.result() for f in futures]
+
+
+def compute_embeddings_multi(*groups: List[str]) -> List[Optional[np.ndarray]]:
+    """
+    Embed several sentence lists at once.
+    Cached sentences are served from EMB_CACHE; only the misses of all groups are
+    queued (together, so they land in the same micro-batch).
+    Returns one array per group (None for empty groups).
+    """
+    if EMB_CACHE is None:
+        return _encode_uncached(groups)
+
+    lookups = [EMB_CACHE.lookup(g) if g else ([], []) for g in groups]
+    missing = list(dict.fromkeys(g[i] for g, (_, miss) in zip(groups, lookups) for i in miss))
+    if missing:
+        new_vecs = _encode_uncached([missing])[0]
+        EMB_CACHE.store(missing, new_vecs)
+        fresh = dict(zip(missing, new_vecs))
+
+    out: List[Optional[np.ndarray]] = []
+    for g, (found, miss) in zip(groups, lookups):
+        if not g:
+            out.append(None)
+            continue
+        for i in miss:
+            found[i] = fresh[g[i]]
+        out.append(np.stack(found))
+    return out
+
+
 def compute_embeddings(sentences: List[str]):
     if not sentences:
         return None
-    return EMB.encode(sentences, convert_to_tensor=True, show_progress_bar=False)
+    return compute_embeddings_multi(sentences)[0]
+
+
+def get_instruction_classifier() -> Optional[InstructionClassifier]:
+    """
+    The shared instruction classifier (None when disabled). Its prototypes are
+    cleaned like prompt sentences and embedded once.
+    """
+    global INSTRUCTION_CLF
+    if INSTRUCTION_CLF is None and INSTRUCTION_CLASSIFIER:
+        with INSTRUCTION_CLF_LOCK:
+            if INSTRUCTION_CLF is None:
+                sentences = [c for p in load_prototypes(INSTRUCTION_PROTOTYPES_PATH) for c in clean_sentences(p)]
+                INSTRUCTION_CLF = InstructionClassifier(compute_embeddings(sentences), INSTRUCTION_THRESHOLD)
+    return INSTRUCTION_CLF
 
 
-def build_improved_answer(user_prompt: str, ai_response: str, missing_topics: List[Dict]) -> str:
+def drop_instruction_sentences(prompt: Dict, user_embs: Optional[np.ndarray]):
+    """
+    Second instruction filter, on the prompt embeddings computed for scoring
+    (no extra encode). Returns (prompt, user_embs) without the sentences the
+    classifier labels as instructions; like the fragment filter, keeps
+    everything if that would leave nothing.
+    """
+    clf = get_instruction_classifier()
+    if clf is None or user_embs is None:
+        return prompt, user_embs
+    keep = np.flatnonzero(~clf.is_instruction(user_embs))
+    if len(keep) in (0, len(user_embs)):
+        return prompt, user_embs
+    return dict(
+        prompt,
+        user_sentences=[prompt["user_sentences"][i] for i in keep],
+        user_spans=[prompt["user_spans"][i] for i in keep],
+    ), user_embs[keep]
+
+
+def embedding_cache_stats() -> Optional[Dict]:
+    return EMB_CACHE.stats() if EMB_CACHE is not None else None
+
+
+def embedding_batcher_stats() -> Optional[Dict]:
+    return dict(EMB_BATCHER.stats) if EMB_BATCHER is not None else None
+
+
+# Fixed English text of the improved-answer guidance (machine-translated line by line when enabled)
+IMPROVED_ANSWER_TEXT = {
+    "current": "Current answer:",
+    "no_answer": "Current answer: (no answer provided)",
+    "incomplete": "The answer is incomplete. It should also cover:",
+    "how_to_improve": (
+        "How to improve this answer:\n"
+        "Start with a clear and correct definition that directly answers the question.\n"
+        "Explain the key ideas or types in 2–3 short sentences.\n"
+        "Add at least one real-world example so that a beginner can understand.\n"
+        "Mention any important differences, pros/cons, or limitations if relevant."
+    ),
+    "on_topic": (
+        "The answer is mostly on topic, but you can improve it by:\n"
+        "Giving a more detailed explanation in simple language.\n"
+        "Adding a concrete real-world example.\n"
+        "Breaking down the concept into 2–3 key points."
+    ),
+}
+
+
+def _improved_answer_keys(ai_response: str, missing_topics: List[Dict], echo_answer: bool = True) -> List[str]:
+    keys = []
+    if echo_answer:
+        keys.append("current" if ai_response.strip() else "no_answer")
+    keys += ["incomplete", "how_to_improve"] if missing_topics else ["on_topic"]
+    return keys
+
+
+def build_improved_answer(user_prompt: str, ai_response: str, missing_topics: List[Dict],
+                          text: Optional[Dict[str, str]] = None, echo_answer: bool = True) -> str:
     """
     Base (English) meta-level improved-answer description.
     This does NOT try to generate the factual answer, only guidance.
+    `text` replaces the fixed phrases (IMPROVED_ANSWER_TEXT), e.g. with translations;
+    echo_answer=False leaves out the copy of the current answer.
     """
+    text = text or IMPROVED_ANSWER_TEXT
     parts = []
 
-    if ai_response.strip():
-        parts.append("Current answer:\n" + ai_response.strip())
-    else:
-        parts.append("Current answer: (no answer provided)")
+    if echo_answer and ai_response.strip():
+        parts.append(text["current"] + "\n" + ai_response.strip())
+    elif echo_answer:
+        parts.append(text["no_answer"])
 
     if missing_topics:
-        parts.append("\nThe answer is incomplete. It should also cover:")
+        parts.append("\n" + text["incomplete"])
         for m in missing_topics:
             parts.append(f"- {m['topic']}")
 
-        parts.append(
-            "\nHow to improve this answer:\n"
-            "Start with a clear and correct definition that directly answers the question.\n"
-            "Explain the key ideas or types in 2–3 short sentences.\n"
-            "Add at least one real-world example so that a beginner can understand.\n"
-            "Mention any important differences, pros/cons, or limitations if relevant."
-        )
+        parts.append("\n" + text["how_to_improve"])
     else:
-        parts.append(
-            "\nThe answer is mostly on topic, but you can improve it by:\n"
-            "Giving a more detailed explanation in simple language.\n"
-            "Adding a concrete real-world example.\n"
-            "Breaking down the concept into 2–3 key points."
-        )
+        parts.append("\n" + text["on_topic"])
 
     return "\n".join(parts).strip()
 
@@ -193,13 +413,14 @@ def build_improved_answer_local(
     user_prompt: str,
     ai_response: str,
     missing_topics: List[Dict],
-    lang: str
+    lang: str,
+    echo_answer: bool = True,
 ) -> str:
     """
     Localized wrapper around the base English meta-answer.
     Keeps base structure, adds localized guidance.
     """
-    base_en = build_improved_answer(user_prompt, ai_response, missing_topics)
+    base_en = build_improved_answer(user_prompt, ai_response, missing_topics, echo_answer=echo_answer)
 
     if lang == "hi":
         extra = (
@@ -234,65 +455,115 @@ def build_improved_answer_local(
 
 # ------------------ Main analyzer function ------------------ #
 
-def analyze_context_full(user_prompt: str, ai_response: str, user_lang: str = "auto") -> Dict:
+def analysis_config() -> Dict:
     """
-    Core analyzer:
-    - Detect user language
-    - Split prompt/response into sentences
-    - Filter out generic instruction-only sentences (e.g. "Explain with an example")
-    - Compute similarities to find missing topics
-    - Penalise very short AI answers
-    - Build localized summary, follow-up prompts, and improved-answer guidance
+    Settings that change the analysis output (part of result-cache keys).
+    """
+    return {
+        "model": EMB_MODEL_NAME,
+        "backend": EMB_BACKEND,
+        "sim_threshold": SIM_THRESHOLD,
+        "min_sent_len": MIN_SENT_LEN,
+        "min_ai_words": MIN_AI_WORDS,
+        "instruction_fragments": INSTRUCTION_FRAGMENTS,
+        "sent_terminators": SENT_TERMINATORS,
+        "instruction_classifier": (
+            {"threshold": INSTRUCTION_THRESHOLD, "prototypes": prototypes_digest(INSTRUCTION_PROTOTYPES_PATH)}
+            if INSTRUCTION_CLASSIFIER else None
+        ),
+        "langid": LANGID_BACKEND,
+        "translation": TRANSLATION_ENABLED,
+    }
+
+
+def iter_clean_sentences(text: str) -> Iterator[str]:
     """
+    Lazily split text into cleaned sentences, dropping very short fragments.
+    """
+    for _, _, c in iter_segments(text, MIN_SENT_LEN):
+        yield c
+
 
-    detected_user_lang = detect_language(user_prompt) or "en"
+def clean_sentences(text: str) -> List[str]:
+    return list(iter_clean_sentences(text))
+
+
+def prepare_prompt(user_prompt: str, user_lang: str = "auto", timings: Optional[Dict] = None) -> Dict:
+    """
+    Prompt-side work shared by every response scored against the same prompt:
+    language detection, sentence splitting + cleaning and instruction filtering.
+    """
+    with stage("detect_language", timings):
+        detected_user_lang = detect_language(user_prompt) or "en"
     output_lang_raw = user_lang if user_lang not in ("", "auto", None) else detected_user_lang
     output_lang = normalize_lang(output_lang_raw)
 
     # Sentence splitting + cleaning
-    raw_user_sentences = [
-        clean_text(s) for s in split_sentences(user_prompt) if len(clean_text(s)) >= MIN_SENT_LEN
-    ]
+    with stage("split_clean", timings):
+        segments = list(iter_segments(user_prompt, MIN_SENT_LEN))
 
     # Filter out generic instruction sentences like "Explain with an example"
-    user_sentences: List[str] = []
-    for s in raw_user_sentences:
-        low = s.lower()
-        if any(fragment in low for fragment in INSTRUCTION_FRAGMENTS):
-            continue
-        user_sentences.append(s)
+    with stage("instruction_filter", timings):
+        kept = [seg for seg in segments if not _INSTRUCTION_RE.search(seg[2])]
 
     # Fallback: if filtering removed everything, use original sentences
-    if not user_sentences:
-        user_sentences = raw_user_sentences
+    if not kept:
+        kept = segments
+
+    return {
+        "user_prompt": user_prompt,
+        "detected_user_lang": detected_user_lang,
+        "output_language": output_lang,
+        "user_sentences": [c for _, _, c in kept],
+        "user_spans": [(start, end) for start, end, _ in kept],  # offsets into user_prompt
+    }
+
+
+# Optional sections of an analysis result (detected_user_lang, output_language and
+# quality_score are always returned). Sections that are not requested are not built.
+RESULT_FIELDS = ("summary", "missing_topics", "follow_up_prompts", "improved_answer", "coverage")
+
+
+def _project(result: Dict, fields: Optional[Collection[str]]) -> Dict:
+    if fields is None:
+        return result
+    return {k: v for k, v in result.items() if k not in RESULT_FIELDS or k in fields}
 
-    ai_sentences = [
-        clean_text(s) for s in split_sentences(ai_response) if len(clean_text(s)) >= MIN_SENT_LEN
-    ]
 
-    if not user_sentences:
-        return {
-            "detected_user_lang": detected_user_lang,
-            "output_language": output_lang,
-            "summary": "",
-            "quality_score": 0.0,
-            "missing_topics": [],
-            "follow_up_prompts": ["Please provide a more detailed user prompt."],
-            "improved_answer": ""
-        }
+def _empty_prompt_result(prompt: Dict, fields: Optional[Collection[str]] = None) -> Dict:
+    return _project({
+        "detected_user_lang": prompt["detected_user_lang"],
+        "output_language": prompt["output_language"],
+        "summary": "",
+        "quality_score": 0.0,
+        "missing_topics": [],
+        "follow_up_prompts": ["Please provide a more detailed user prompt."],
+        "improved_answer": "",
+        "coverage": [],
+    }, fields)
 
-    # Quick low-quality check
-    ai_word_count = len(ai_response.split())
-    too_short_ai = ai_word_count < MIN_AI_WORDS
 
-    user_embs = compute_embeddings(user_sentences)
-    ai_embs   = compute_embeddings(ai_sentences) if ai_sentences and not too_short_ai else None
+def _is_too_short(ai_response: str) -> bool:
+    # Quick low-quality check (maxsplit: no need to split a long answer completely)
+    return len(ai_response.split(None, MIN_AI_WORDS)) < MIN_AI_WORDS
 
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def _count_words(text: str) -> int:
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+
+def _detect_gaps(user_sentences: List[str], cov: Optional[Dict], output_lang: str):
+    """
+    Missing topics + their suggestions from a score_coverage() result.
+    cov None => the answer was not scored and everything is missing.
+    """
     missing: List[Dict] = []
     followups: List[str] = []
 
-    # ---- Gap detection ----
-    if too_short_ai or not ai_sentences:
+    if cov is None:
         # Treat everything as missing
         for u in user_sentences:
             suggestion = make_suggestion(u, output_lang)
@@ -305,54 +576,290 @@ def analyze_context_full(user_prompt: str, ai_response: str, user_lang: str = "a
             })
             followups.append(suggestion)
     else:
-        # Similarity-based matching user -> AI
-        for idx, u in enumerate(user_sentences):
-            sims = util.cos_sim(user_embs[idx], ai_embs).cpu().numpy()
-            max_sim = float(np.max(sims))
-            confidence = round(1.0 - max_sim, 3)
-
-            if max_sim < SIM_THRESHOLD:
-                suggestion = make_suggestion(u, output_lang)
-                missing.append({
-                    "topic": u,
-                    "max_similarity": round(max_sim, 3),
-                    "confidence": confidence,
-                    "suggestion_en": suggestion,
-                    "suggestion_local": suggestion,
-                })
-                followups.append(suggestion)
-
-    has_missing = len(missing) > 0
-
-    # ---- Follow-ups ----
-    if not followups:
-        # nothing missing => generic depth prompts
-        followups = make_generic_followups(output_lang, has_missing=False)
-    else:
-        # add generic depth prompts even when missing exists
-        extra = make_generic_followups(output_lang, has_missing=True)
-        followups.extend(extra)
+        # Only the prompt sentences below SIM_THRESHOLD need text built for them
+        max_sims = cov["max_similarity"]
+        for idx in np.flatnonzero(cov["missing"]):
+            u = user_sentences[idx]
+            max_sim = float(max_sims[idx])
+            suggestion = make_suggestion(u, output_lang)
+            missing.append({
+                "topic": u,
+                "max_similarity": round(max_sim, 3),
+                "confidence": round(1.0 - max_sim, 3),
+                "suggestion_en": suggestion,
+                "suggestion_local": suggestion,
+            })
+            followups.append(suggestion)
+
+    return missing, followups
+
+
+def _coverage_field(user_sentences: List[str], ai_sentences: List[str], cov: Optional[Dict],
+                    spans: List[Span]) -> List[Dict]:
+    """
+    Per prompt sentence: its offsets in the prompt, best similarity and the AI
+    sentence that covers it best.
+    """
+    if cov is None:
+        return [
+            {"topic": u, "topic_span": sp, "max_similarity": 0.0, "best_match_index": None,
+             "best_match": None, "covered": False}
+            for u, sp in zip(user_sentences, spans)
+        ]
+    sims = np.round(cov["max_similarity"].astype(np.float64), 3).tolist()
+    best = cov["best_match"].tolist()
+    missing = cov["missing"].tolist()
+    # Streaming scorers carry the matched text because they don't keep every AI sentence
+    texts = cov.get("best_match_text") or [ai_sentences[b] for b in best]
+    return [
+        {"topic": u, "topic_span": sp, "max_similarity": sim, "best_match_index": b if b >= 0 else None,
+         "best_match": t, "covered": not m}
+        for u, sp, sim, b, t, m in zip(user_sentences, spans, sims, best, texts, missing)
+    ]
+
+
+def _translate_output(prompt: Dict, ai_response: str, missing: List[Dict], followups: List[str],
+                      echo_answer: bool = True) -> Optional[str]:
+    """
+    Machine-translate the suggestions (in place, together with their follow-ups)
+    and the improved-answer guidance in one batch. Strings not translated within
+    the budget keep their template text; returns the translated improved answer,
+    or None if any of its lines is missing.
+    """
+    lang = prompt["output_language"]
+    en_suggestions = [make_suggestion(m["topic"], "en") for m in missing]
+    keys = _improved_answer_keys(ai_response, missing, echo_answer)
+    lines = [line for k in keys for line in IMPROVED_ANSWER_TEXT[k].split("\n")]
+
+    out = translate_many(en_suggestions + lines, lang)
+
+    for i, (m, en, local) in enumerate(zip(missing, en_suggestions, out)):
+        m["suggestion_en"] = en
+        if local is not None:
+            m["suggestion_local"] = local
+            followups[i] = local
+
+    translated = out[len(missing):]
+    if any(t is None for t in translated):
+        return None
+    text, pos = {}, 0
+    for k in keys:
+        n = IMPROVED_ANSWER_TEXT[k].count("\n") + 1
+        text[k] = "\n".join(translated[pos:pos + n])
+        pos += n
+    return build_improved_answer(prompt["user_prompt"], ai_response, missing, text=text, echo_answer=echo_answer)
+
+
+def _build_result(prompt: Dict, ai_response: str, ai_sentences: List[str], cov: Optional[Dict],
+                  timings: Optional[Dict] = None, fields: Optional[Collection[str]] = None,
+                  echo_answer: bool = True) -> Dict:
+    """
+    Gap detection, follow-ups, quality score, summary and improved answer for one response.
+    cov is the score_coverage() result, or None when the answer was not scored
+    (too short / no sentences).
+    `fields` limits the optional sections (RESULT_FIELDS) that are built and returned.
+    """
+    output_lang = prompt["output_language"]
+    want = set(RESULT_FIELDS if fields is None else fields)
+    quality_score = 2.0 if cov is None else cov["quality_score"]
+    result = {
+        "detected_user_lang": prompt["detected_user_lang"],
+        "output_language": output_lang,
+    }
+
+    # ---- Gap detection ----
+    missing, followups = [], []
+    with stage("gap_detection", timings):
+        if want & {"missing_topics", "follow_up_prompts", "improved_answer"}:
+            missing, followups = _detect_gaps(prompt["user_sentences"], cov, output_lang)
+        if "coverage" in want:
+            coverage = _coverage_field(prompt["user_sentences"], ai_sentences, cov, prompt["user_spans"])
+
+    improved_local = None
+    if translation_enabled(output_lang) and (missing or "improved_answer" in want):
+        with stage("translation", timings):
+            improved_local = _translate_output(prompt, ai_response, missing, followups, echo_answer)
+
+    with stage("localized_text", timings):
+        # ---- Follow-ups ----
+        if "follow_up_prompts" in want:
+            if not followups:
+                # nothing missing => generic depth prompts
+                followups = make_generic_followups(output_lang, has_missing=False)
+            else:
+                # add generic depth prompts even when missing exists
+                extra = make_generic_followups(output_lang, has_missing=True)
+                followups.extend(extra)
+
+        # ---- Quality score & summary ----
+        if "summary" in want:
+            result["summary"] = make_summary(quality_score, cov is None, output_lang)
+        result["quality_score"] = quality_score
+
+        if "missing_topics" in want:
+            result["missing_topics"] = missing
+        if "follow_up_prompts" in want:
+            result["follow_up_prompts"] = followups
+
+        # ---- Improved answer (meta guidance, localized) ----
+        if "improved_answer" in want:
+            if improved_local is None:
+                improved_local = build_improved_answer_local(
+                    prompt["user_prompt"], ai_response, missing, output_lang, echo_answer
+                )
+            result["improved_answer"] = improved_local
+
+    if "coverage" in want:
+        result["coverage"] = coverage
+    return result
+
+
+def analyze_context_full(user_prompt: str, ai_response: str, user_lang: str = "auto",
+                         timings: Optional[Dict] = None, fields: Optional[Collection[str]] = None,
+                         echo_answer: bool = True) -> Dict:
+    """
+    Core analyzer:
+    - Detect user language
+    - Split prompt/response into sentences
+    - Filter out generic instruction-only sentences (e.g. "Explain with an example")
+    - Compute similarities to find missing topics (and which AI sentence covers each prompt sentence)
+    - Penalise very short AI answers
+    - Build localized summary, follow-up prompts, and improved-answer guidance
+
+    Pass a dict as `timings` to get per-stage latencies (ms) filled in.
+    `fields` (subset of RESULT_FIELDS, None = all) skips building the other
+    sections; echo_answer=False keeps the answer out of improved_answer.
+    """
+    prompt = prepare_prompt(user_prompt, user_lang, timings)
+    if not prompt["user_sentences"]:
+        return _empty_prompt_result(prompt, fields)
+
+    with stage("split_clean", timings):
+        ai_stream = iter_clean_sentences(ai_response)
+        if LONG_DOC_SENTENCES > 0:
+            ai_sentences = list(islice(ai_stream, LONG_DOC_SENTENCES + 1))
+        else:
+            ai_sentences = list(ai_stream)
+
+    if LONG_DOC_SENTENCES > 0 and len(ai_sentences) > LONG_DOC_SENTENCES:
+        return _analyze_long_response(prompt, ai_response, ai_sentences, ai_stream, timings, fields, echo_answer)
+
+    scored = bool(ai_sentences) and not _is_too_short(ai_response)
+
+    observe_request_sizes(
+        len(prompt["user_sentences"]), len(ai_sentences),
+        _count_words(user_prompt), _count_words(ai_response),
+    )
+
+    with stage("embeddings", timings):
+        user_embs, ai_embs = compute_embeddings_multi(
+            prompt["user_sentences"],
+            ai_sentences if scored else [],
+        )
+    with stage("instruction_filter", timings):
+        prompt, user_embs = drop_instruction_sentences(prompt, user_embs)
+
+    cov = None
+    if scored:
+        with stage("similarity", timings):
+            cov = score_coverage(user_embs, ai_embs, SIM_THRESHOLD)
 
-    # ---- Quality score & summary ----
-    if too_short_ai or not ai_sentences:
-        quality_score = 2.0
+    return _build_result(prompt, ai_response, ai_sentences, cov, timings, fields, echo_answer)
+
+
+def _long_doc_chunk_size(n_user: int) -> int:
+    """
+    Sentences per chunk so that one chunk's working set (raw + normalized
+    embeddings, a cached copy and the n_user x chunk similarity block) fits
+    in LONG_DOC_MEMORY_MB.
+    """
+    dim = (EMB.dim if EMB is not None else None) or EMB_DIM_HINT
+    per_sentence = (3 * dim + n_user) * 4
+    budget = int(LONG_DOC_MEMORY_MB * 1024 * 1024) // per_sentence
+    return max(16, min(LONG_DOC_CHUNK, budget))
+
+
+def _analyze_long_response(prompt: Dict, ai_response: str, head: List[str], rest: Iterator[str],
+                           timings: Optional[Dict] = None, fields: Optional[Collection[str]] = None,
+                           echo_answer: bool = True) -> Dict:
+    """
+    Long-document mode: the response is split and encoded chunk by chunk as a
+    stream (`head` = sentences already split, `rest` = the lazy remainder) and
+    only a running best match per prompt sentence is kept. Gives the same
+    result as the dense path; peak memory is bounded by LONG_DOC_MEMORY_MB
+    (plus the input text) unless the optional ANN index is used.
+    """
+    user_embs = compute_embeddings(prompt["user_sentences"])
+    prompt, user_embs = drop_instruction_sentences(prompt, user_embs)
+
+    # Exact running scores first; past LONG_DOC_ANN_SENTENCES (counted as the
+    # chunks stream in, so the response is never split twice) later chunks go
+    # into an ANN index and the two are merged at the end
+    use_ann = LONG_DOC_ANN_SENTENCES > 0 and ann_available()
+    acc = RunningCoverage(user_embs, SIM_THRESHOLD)
+    chunk = _long_doc_chunk_size(len(prompt["user_sentences"]))
+
+    stream = chain(head, rest)
+    del head
+    while True:
+        with stage("split_clean", timings):
+            part = list(islice(stream, chunk))
+        if not part:
+            break
+        with stage("embeddings", timings):
+            embs = compute_embeddings(part)
+        with stage("similarity", timings):
+            if use_ann and isinstance(acc, RunningCoverage) and acc.seen >= LONG_DOC_ANN_SENTENCES:
+                acc = AnnCoverage(user_embs, SIM_THRESHOLD, start=acc)
+            acc.update(embs, part)
+
+    observe_request_sizes(
+        len(prompt["user_sentences"]), acc.seen,
+        _count_words(prompt["user_prompt"]), _count_words(ai_response),
+    )
+
+    cov = None if _is_too_short(ai_response) else acc.result()
+    return _build_result(prompt, ai_response, [], cov, timings, fields, echo_answer)
+
+
+def analyze_context_many(user_prompt: str, responses: List[str], user_lang: str = "auto",
+                         fields: Optional[Collection[str]] = None, echo_answer: bool = True) -> Dict:
+    """
+    Score many candidate responses against one prompt.
+    The prompt is prepared and embedded once, all response sentences are encoded
+    in one batch and coverage for every candidate comes from one stacked
+    similarity matrix. Returns per-candidate results (same shape as
+    analyze_context_full) plus a ranking of candidate indices, best first.
+    """
+    prompt = prepare_prompt(user_prompt, user_lang)
+
+    if not prompt["user_sentences"]:
+        results = [_empty_prompt_result(prompt, fields) for _ in responses]
     else:
-        sims_matrix = util.cos_sim(user_embs, ai_embs).cpu().numpy()
-        max_per_user = np.max(sims_matrix, axis=1) if sims_matrix.size else np.array([0.0])
-        avg_sim = float(np.mean(max_per_user))
-        quality_score = round(max(0.0, min(1.0, avg_sim)) * 10.0, 2)
+        ai_lists = [clean_sentences(r) for r in responses]
+        scored = [i for i, r in enumerate(responses) if ai_lists[i] and not _is_too_short(r)]
+        flat_ai = [s for i in scored for s in ai_lists[i]]
+
+        user_embs, ai_embs = compute_embeddings_multi(prompt["user_sentences"], flat_ai)
+        prompt, user_embs = drop_instruction_sentences(prompt, user_embs)
 
-    summary = make_summary(quality_score, too_short_ai or not ai_sentences, output_lang)
+        covs: Dict[int, Dict] = {}
+        if scored:
+            per_candidate = score_coverage_segments(
+                user_embs, ai_embs, [len(ai_lists[i]) for i in scored], SIM_THRESHOLD
+            )
+            covs = dict(zip(scored, per_candidate))
 
-    # ---- Improved answer (meta guidance, localized) ----
-    improved_local = build_improved_answer_local(user_prompt, ai_response, missing, output_lang)
+        results = [
+            _build_result(prompt, r, ai_lists[i], covs.get(i), fields=fields, echo_answer=echo_answer)
+            for i, r in enumerate(responses)
+        ]
+
+    ranking = sorted(range(len(results)), key=lambda i: (-results[i]["quality_score"], i))
 
     return {
-        "detected_user_lang": detected_user_lang,
-        "output_language": output_lang,
-        "summary": summary,
-        "quality_score": quality_score,
-        "missing_topics": missing,
-        "follow_up_prompts": followups,
-        "improved_answer": improved_local,
+        "detected_user_lang": prompt["detected_user_lang"],
+        "output_language": prompt["output_language"],
+        "results": results,
+        "ranking": ranking,
     }
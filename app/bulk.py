@@ -0,0 +1,250 @@
+# app/bulk.py
+"""
+Streaming bulk evaluation over JSONL.
+
+    python -m app.bulk samples/bulk_input.jsonl results.jsonl --workers 4
+
+Each input line is {"user_prompt": ..., "ai_response": ..., "output_language": ...}.
+Records are fanned out to a pool of worker processes (each loads the model once)
+and results are written as JSONL in input order. Only a bounded window of
+records is in flight, so memory stays flat on multi-GB inputs.
+
+Progress is checkpointed next to the output file (<output>.ckpt). Re-running
+the same command after a crash resumes after the last checkpointed record.
+
+With --store DIR every result is also appended to an evaluation store
+(app.evalstore) for corpus-level queries; an optional "model" field on the
+input record names the model that wrote the answer.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from app.serving import set_torch_threads, threads_per_worker
+
+# Set in each worker process by _init_worker
+_analyze = None
+_embed = None
+
+
+# ------------------ Worker side ------------------ #
+
+def _init_worker(threads: int):
+    global _analyze, _embed
+    set_torch_threads(threads)
+
+    import app.analyzer as analyzer
+    # One request at a time per process: waiting for a micro-batch only adds latency
+    analyzer.EMB_BATCH_MAX_WAIT_MS = 0
+    analyzer.warmup()
+    _analyze = analyzer.analyze_context_full
+    _embed = analyzer.compute_embeddings
+
+
+def _analyze_line(index: int, line: str, keep: bool = False):
+    """
+    One JSONL result line; with keep=True also what the evaluation store needs
+    (None for failed records).
+    """
+    kept = None
+    try:
+        rec = json.loads(line)
+        result = _analyze(
+            user_prompt=rec.get("user_prompt", ""),
+            ai_response=rec.get("ai_response", ""),
+            user_lang=rec.get("output_language", "auto"),
+        )
+        out = {"index": index}
+        if "id" in rec:
+            out["id"] = rec["id"]
+        out.update(result)
+        if keep:
+            # The prompt sentences were just embedded, so this hits the embedding cache
+            embs = _embed([c["topic"] for c in result["coverage"]])
+            kept = (result, embs, rec.get("id", index), rec.get("model"))
+    except Exception as e:
+        out = {"index": index, "error": f"{type(e).__name__}: {e}"}
+    line = json.dumps(out, ensure_ascii=False) + "\n"
+    return (line, kept) if keep else line
+
+
+# ------------------ Checkpointing ------------------ #
+
+def _load_checkpoint(path: str, input_path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        ckpt = json.load(f)
+    if ckpt.get("input") != os.path.abspath(input_path):
+        raise SystemExit(f"Checkpoint {path} was written for a different input: {ckpt.get('input')}")
+    return ckpt
+
+
+def _save_checkpoint(path: str, ckpt: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ------------------ Driver ------------------ #
+
+def run_bulk(
+    input_path: str,
+    output_path: str,
+    workers: int = 0,
+    max_in_flight: int = 0,
+    checkpoint_every: int = 200,
+    resume: bool = True,
+    store_dir: Optional[str] = None,
+    store_dtype: str = "float16",
+    store_append: bool = False,
+) -> int:
+    """
+    Returns the number of records processed in this run.
+    A fresh (non-resumed) run refuses a store that already holds evaluations
+    unless store_append is set, so rerunning a file cannot count it twice.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 4
+    ckpt_path = output_path + ".ckpt"
+
+    ckpt = _load_checkpoint(ckpt_path, input_path) if resume else None
+    done = ckpt["records_done"] if ckpt else 0
+    in_offset = ckpt["input_offset"] if ckpt else 0
+    out_offset = ckpt["output_offset"] if ckpt else 0
+
+    if ckpt:
+        have = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        if have < out_offset:
+            # Seeking past the end would pad the file with NUL bytes
+            raise SystemExit(
+                f"Cannot resume: {output_path} has {have} bytes, but the checkpoint "
+                f"{ckpt_path} expects at least {out_offset} bytes. Restore the file or rerun with --no-resume."
+            )
+        print(f"Resuming after {done} records", file=sys.stderr)
+
+    store = None
+    if store_dir:
+        from app.analyzer import EMB_BACKEND, EMB_MODEL_NAME
+        from app.encoders import cache_name_for
+        from app.evalstore import EvaluationStore
+
+        store = EvaluationStore(store_dir, cache_name_for(EMB_MODEL_NAME, EMB_BACKEND), dtype=store_dtype)
+        if ckpt and "store_records" in ckpt:
+            # Drop evaluations stored after the last checkpoint (they will be recomputed)
+            store.truncate_records(ckpt["store_records"])
+        elif not ckpt and len(store) and not store_append:
+            raise SystemExit(
+                f"{store_dir} already holds {len(store)} evaluations. Rerunning an input would store it twice: "
+                "use an empty directory, or pass --store-append to add this run to the existing ones."
+            )
+
+    fin = open(input_path, "rb")
+    fout = open(output_path, "r+b" if ckpt and os.path.exists(output_path) else "wb")
+    fin.seek(in_offset)
+    # Drop anything written after the last checkpoint (it will be recomputed)
+    fout.seek(out_offset)
+    fout.truncate()
+
+    def commit(processed: int):
+        fout.flush()
+        os.fsync(fout.fileno())
+        state = {
+            "input": os.path.abspath(input_path),
+            "records_done": processed,
+            "input_offset": in_offset,
+            "output_offset": fout.tell(),
+        }
+        if store is not None:
+            store.flush()
+            state["store_records"] = len(store)
+        _save_checkpoint(ckpt_path, state)
+
+    start = time.time()
+    processed_now = 0
+    index = done
+    window: deque = deque()  # (AsyncResult, input offset after this record), in input order
+
+    def write_oldest():
+        nonlocal done, in_offset, processed_now
+        res, end_offset = window.popleft()
+        out = res.get()
+        if store is not None:
+            out, kept = out
+            if kept is not None:
+                result, embs, source, model = kept
+                store.add(result, embs, source=source, model=model)
+        fout.write(out.encode("utf-8"))
+        done += 1
+        processed_now += 1
+        in_offset = end_offset
+        if processed_now % checkpoint_every == 0:
+            commit(done)
+            rate = processed_now / max(time.time() - start, 1e-9)
+            print(f"{done} records done ({rate:.1f}/s)", file=sys.stderr)
+
+    with mp.Pool(workers, initializer=_init_worker, initargs=(threads_per_worker(workers),)) as pool:
+        offset = in_offset
+        for raw in fin:
+            offset += len(raw)
+            line = raw.decode("utf-8").strip()
+            if not line:
+                # Blank line: nothing to submit. Only advance the resume offset
+                # when nothing earlier is still pending.
+                if not window:
+                    in_offset = offset
+                continue
+            window.append((pool.apply_async(_analyze_line, (index, line, store is not None)), offset))
+            index += 1
+            while len(window) >= max_in_flight:
+                write_oldest()
+
+        while window:
+            write_oldest()
+
+    commit(done)
+    fin.close()
+    fout.close()
+    print(f"Finished: {done} records ({processed_now} this run) in {time.time() - start:.1f}s", file=sys.stderr)
+    return processed_now
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bulk", description="Bulk JSONL evaluation.")
+    parser.add_argument("input", help="JSONL file of {user_prompt, ai_response, output_language}")
+    parser.add_argument("output", help="JSONL results file (written in input order)")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="records queued at once (default: 4 x workers)")
+    parser.add_argument("--checkpoint-every", type=int, default=200, help="records between checkpoints")
+    parser.add_argument("--no-resume", action="store_true", help="ignore an existing checkpoint and start over")
+    parser.add_argument("--store", help="also append results to this evaluation store directory (app.evalstore)")
+    parser.add_argument("--store-dtype", choices=("float16", "int8"), default="float16",
+                        help="embedding precision for a new store")
+    parser.add_argument("--store-append", action="store_true",
+                        help="allow a fresh run to add to a store that already holds evaluations")
+    args = parser.parse_args(argv)
+
+    run_bulk(
+        args.input,
+        args.output,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        checkpoint_every=max(1, args.checkpoint_every),
+        resume=not args.no_resume,
+        store_dir=args.store,
+        store_dtype=args.store_dtype,
+        store_append=args.store_append,
+    )
+
+
+if __name__ == "__main__":
+    main()
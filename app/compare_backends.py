@@ -0,0 +1,128 @@
+# app/compare_backends.py
+"""
+Agreement report between encoder backends.
+
+    python -m app.compare_backends --backends torch onnx onnx-int8 \\
+        --fixtures samples/bulk_input.jsonl
+
+The first backend is the reference. For every other backend the tool reports
+drift in per-sentence `max_similarity` and in `quality_score`, how many
+missing-topic decisions flip, and encode latency relative to the reference.
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app import analyzer
+from app.encoders import ENCODER_BACKENDS, make_encoder
+from app.scoring import score_coverage
+
+
+def load_fixtures(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def score_with_encoder(encoder, fixtures: List[Dict]) -> List[Dict]:
+    """
+    Run the analyzer scoring for each fixture with `encoder`, bypassing the
+    shared embedding cache and batcher so every backend does its own encoding.
+    """
+    scored = []
+    for rec in fixtures:
+        ai_response = rec.get("ai_response", "")
+        prompt = analyzer.prepare_prompt(rec.get("user_prompt", ""), rec.get("output_language", "auto"))
+        ai_sentences = analyzer.clean_sentences(ai_response)
+
+        cov = None
+        encode_s = 0.0
+        if prompt["user_sentences"] and ai_sentences and not analyzer._is_too_short(ai_response):
+            t0 = time.perf_counter()
+            user_embs = encoder.encode(prompt["user_sentences"])
+            ai_embs = encoder.encode(ai_sentences)
+            encode_s = time.perf_counter() - t0
+            cov = score_coverage(user_embs, ai_embs, analyzer.SIM_THRESHOLD)
+
+        if prompt["user_sentences"]:
+            result = analyzer._build_result(prompt, ai_response, ai_sentences, cov)
+        else:
+            result = analyzer._empty_prompt_result(prompt)
+
+        scored.append({
+            "max_similarity": cov["max_similarity"] if cov is not None else np.zeros(0),
+            "quality_score": result["quality_score"],
+            "missing": {m["topic"] for m in result["missing_topics"]},
+            "encode_s": encode_s,
+        })
+    return scored
+
+
+def compare(reference: List[Dict], candidate: List[Dict]) -> Dict:
+    sim_drift = np.concatenate(
+        [np.abs(r["max_similarity"] - c["max_similarity"]) for r, c in zip(reference, candidate)]
+        or [np.zeros(0)]
+    )
+    score_drift = np.array([abs(r["quality_score"] - c["quality_score"]) for r, c in zip(reference, candidate)])
+    flips = sum(len(r["missing"] ^ c["missing"]) for r, c in zip(reference, candidate))
+    ref_time = sum(r["encode_s"] for r in reference)
+    cand_time = sum(c["encode_s"] for c in candidate)
+    return {
+        "max_similarity_drift_mean": round(float(sim_drift.mean()), 5) if sim_drift.size else 0.0,
+        "max_similarity_drift_max": round(float(sim_drift.max()), 5) if sim_drift.size else 0.0,
+        "quality_score_drift_mean": round(float(score_drift.mean()), 4) if score_drift.size else 0.0,
+        "quality_score_drift_max": round(float(score_drift.max()), 4) if score_drift.size else 0.0,
+        "missing_topic_flips": flips,
+        "encode_ms_total": round(cand_time * 1000, 1),
+        "speedup_vs_reference": round(ref_time / cand_time, 2) if cand_time else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.compare_backends", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"],
+                        choices=sorted(ENCODER_BACKENDS), help="first backend is the reference")
+    parser.add_argument("--fixtures", default="samples/bulk_input.jsonl", help="JSONL fixture set")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes per backend (best is kept)")
+    parser.add_argument("--json", dest="json_out", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(args.fixtures)
+    runs: Dict[str, List[Dict]] = {}
+    for backend in args.backends:
+        encoder = make_encoder(analyzer.EMB_MODEL_NAME, backend)
+        score_with_encoder(encoder, fixtures[:1])  # warmup
+        passes = [score_with_encoder(encoder, fixtures) for _ in range(max(1, args.repeat))]
+        runs[backend] = min(passes, key=lambda p: sum(r["encode_s"] for r in p))
+
+    ref_name = args.backends[0]
+    report = {
+        "reference": ref_name,
+        "fixtures": len(fixtures),
+        "backends": {name: compare(runs[ref_name], runs[name]) for name in args.backends},
+    }
+
+    print(f"Reference: {ref_name}  ({len(fixtures)} fixtures)")
+    header = f"{'backend':<12}{'sim drift mean/max':>22}{'score drift mean/max':>24}{'flips':>7}{'encode ms':>11}{'speedup':>9}"
+    print(header)
+    for name, r in report["backends"].items():
+        print(
+            f"{name:<12}"
+            f"{r['max_similarity_drift_mean']:>11.4f}/{r['max_similarity_drift_max']:<10.4f}"
+            f"{r['quality_score_drift_mean']:>12.3f}/{r['quality_score_drift_max']:<11.3f}"
+            f"{r['missing_topic_flips']:>7}"
+            f"{r['encode_ms_total']:>11.1f}"
+            f"{(r['speedup_vs_reference'] or 0):>8.2f}x"
+        )
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# app/encoders.py
+"""
+Sentence encoder backends.
+
+- torch     : full-precision PyTorch SentenceTransformer (original behaviour)
+- onnx      : exported ONNX Runtime graph of the same model
+- onnx-int8 : dynamically quantized int8 ONNX graph (fastest on CPU-only nodes)
+- fake      : deterministic stand-in with a simulated compute cost and no model
+              download, for load-testing the serving layers (not for real scores)
+
+Pick one with TOTEM_ENCODER_BACKEND. Use `python -m app.compare_backends` to
+measure how far a backend drifts from the torch reference before switching.
+"""
+
+import hashlib
+import os
+import re
+import time
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+
+DEFAULT_BACKEND = "torch"
+
+# Quantized graph shipped in the model repo's onnx/ folder (or a path inside a local model dir)
+ONNX_INT8_FILE = os.getenv("TOTEM_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+# Stand-in encoder: vector width and simulated cost of one encode() call
+FAKE_DIM = int(os.getenv("TOTEM_FAKE_ENCODER_DIM", "384"))
+FAKE_BATCH_MS = float(os.getenv("TOTEM_FAKE_ENCODER_BATCH_MS", "2"))           # fixed cost per call
+FAKE_SENTENCE_MS = float(os.getenv("TOTEM_FAKE_ENCODER_SENTENCE_MS", "0.5"))   # extra cost per sentence
+FAKE_BUSY = os.getenv("TOTEM_FAKE_ENCODER_BUSY", "0") == "1"                   # burn CPU instead of sleeping
+
+
+class Encoder:
+    """
+    Minimal interface the analyzer needs: encode(list of sentences) -> float32 array (n, dim).
+    """
+
+    backend = "base"
+    dim: Optional[int] = None  # embedding width, when known
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def cache_name(self) -> str:
+        return cache_name_for(self.model_name, self.backend)
+
+    def encode(self, sentences: List[str], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TorchEncoder(Encoder):
+    backend = "torch"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(
+            sentences,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+
+class OnnxEncoder(TorchEncoder):
+    """
+    Same SentenceTransformer pipeline (tokenizer + pooling) with the transformer
+    running in ONNX Runtime. Requires `sentence-transformers[onnx]`.
+    """
+
+    backend = "onnx"
+    onnx_file: Optional[str] = None
+
+    def __init__(self, model_name: str):
+        Encoder.__init__(self, model_name)
+        from sentence_transformers import SentenceTransformer
+        model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+        self.model = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+
+class OnnxInt8Encoder(OnnxEncoder):
+    backend = "onnx-int8"
+    onnx_file = ONNX_INT8_FILE
+
+
+class FakeEncoder(Encoder):
+    """
+    Deterministic vectors without a model: each word is hashed to a few signed
+    dimensions (feature hashing), so sentences sharing words come out similar
+    and the analyzer output keeps a realistic shape. Every call takes
+    FAKE_BATCH_MS + FAKE_SENTENCE_MS per sentence, by default sleeping (the GIL
+    is released, like a real forward pass); TOTEM_FAKE_ENCODER_BUSY=1 spins
+    the CPU instead.
+    """
+
+    backend = "fake"
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.dim = FAKE_DIM
+
+    def _vector(self, sentence: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in self._WORD.findall(sentence.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=12).digest()
+            for i in range(0, 12, 4):  # three signed dimensions per word
+                h = int.from_bytes(digest[i:i + 4], "little")
+                vec[h % self.dim] += 1.0 if (h // self.dim) & 1 else -1.0
+        if not vec.any():
+            vec[0] = 1.0
+        return vec
+
+    def encode(self, sentences: List[str], batch_size: int = 32) -> np.ndarray:
+        cost = (FAKE_BATCH_MS + FAKE_SENTENCE_MS * len(sentences)) / 1000.0
+        deadline = time.perf_counter() + cost
+        out = np.stack([self._vector(s) for s in sentences]) if sentences else np.zeros((0, self.dim), np.float32)
+        if FAKE_BUSY:
+            while time.perf_counter() < deadline:
+                pass
+        else:
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+        return out
+
+
+ENCODER_BACKENDS: Dict[str, Type[Encoder]] = {
+    TorchEncoder.backend: TorchEncoder,
+    OnnxEncoder.backend: OnnxEncoder,
+    OnnxInt8Encoder.backend: OnnxInt8Encoder,
+    FakeEncoder.backend: FakeEncoder,
+}
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """
+    Validated backend name (defaults to TOTEM_ENCODER_BACKEND, then torch).
+    """
+    backend = (backend or os.getenv("TOTEM_ENCODER_BACKEND") or DEFAULT_BACKEND).lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(
+            f"Unknown encoder backend {backend!r}; choose one of {sorted(ENCODER_BACKENDS)}"
+        )
+    return backend
+
+
+def cache_name_for(model_name: str, backend: Optional[str] = None) -> str:
+    """
+    Embedding-cache namespace. Vectors from different backends differ slightly,
+    so they never share cache entries. Known without loading the model.
+    """
+    backend = resolve_backend(backend)
+    if backend == DEFAULT_BACKEND:
+        return model_name
+    return f"{model_name}@{backend}"
+
+
+def make_encoder(model_name: str, backend: Optional[str] = None) -> Encoder:
+    """
+    Build (and load) the encoder for `backend`.
+    """
+    return ENCODER_BACKENDS[resolve_backend(backend)](model_name)
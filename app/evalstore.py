@@ -0,0 +1,671 @@
+# app/evalstore.py
+"""
+On-disk store of past evaluations for corpus-level analytics.
+
+    python -m app.bulk input.jsonl results.jsonl --store evals/
+    python -m app.evalstore evals/ summary
+    python -m app.evalstore evals/ missing --model gpt-4o --top 20
+    python -m app.evalstore evals/ scores --by lang
+    python -m app.evalstore evals/ clusters --k 30
+    python -m app.evalstore evals/ nearest "What is overfitting"
+
+Two append-only columnar tables, one raw file per column:
+  - records: one row per evaluation (source id, model, language, quality score)
+  - topics:  one row per prompt sentence (record row, text, max similarity,
+             covered flag, language, model, text hash, embedding)
+
+Embeddings are L2-normalized and stored as float16, or int8 with a per-row
+scale. Every column is read through np.memmap and every query walks the
+tables in fixed-size chunks, so queries work on stores larger than RAM.
+Appends take an exclusive file lock; readers only see whole rows.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.scoring import normalize_rows
+from app.utils.embcache import normalize_key_text
+
+try:
+    import fcntl  # POSIX only; used to serialise appends from several processes
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+VECTOR_DTYPES = ("float16", "int8")
+CHUNK_ROWS = int(os.getenv("TOTEM_EVAL_STORE_CHUNK_ROWS", "262144"))  # rows per query chunk
+SCORE_BINS = 101  # 0.1-wide quality-score bins over [0, 10]; percentiles are read from them
+
+
+def topic_hash(text: str) -> int:
+    """
+    64-bit key that groups the same topic across evaluations (case and
+    whitespace insensitive).
+    """
+    digest = hashlib.blake2b(normalize_key_text(text).lower().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _chunks(n: int, size: int) -> Iterator[slice]:
+    for start in range(0, n, size):
+        yield slice(start, min(n, start + size))
+
+
+# ------------------ Columnar tables ------------------ #
+
+class _Table:
+    """
+    Append-only table stored as one raw file per column (`<name>.<column>`).
+    Fixed-width columns take a dtype or (dtype, width) for vectors; string
+    columns are a UTF-8 heap (`.bin`) plus uint64 end offsets. The row count
+    is the shortest column, so a torn append is simply not visible.
+    """
+
+    def __init__(self, directory: str, name: str, schema: Dict[str, object], strings: Sequence[str] = ()):
+        self.directory = directory
+        self.name = name
+        self.schema: Dict[str, Tuple[np.dtype, int]] = {}
+        for col, spec in schema.items():
+            dtype, width = spec if isinstance(spec, tuple) else (spec, 0)
+            self.schema[col] = (np.dtype(dtype), width)
+        for col in strings:
+            self.schema[col] = (np.dtype(np.uint64), 0)
+        self.strings = tuple(strings)
+
+    def _path(self, col: str) -> str:
+        return os.path.join(self.directory, f"{self.name}.{col}")
+
+    def _row_bytes(self, col: str) -> int:
+        dtype, width = self.schema[col]
+        return dtype.itemsize * max(1, width)
+
+    def __len__(self) -> int:
+        rows = None
+        for col in self.schema:
+            path = self._path(col)
+            n = os.path.getsize(path) // self._row_bytes(col) if os.path.exists(path) else 0
+            rows = n if rows is None else min(rows, n)
+        return rows or 0
+
+    def column(self, col: str, rows: Optional[int] = None) -> np.ndarray:
+        """
+        Read-only memmap of the first `rows` rows (default: all complete rows).
+        """
+        rows = len(self) if rows is None else rows
+        dtype, width = self.schema[col]
+        shape = (rows, width) if width else (rows,)
+        if rows == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._path(col), dtype=dtype, mode="r", shape=shape)
+
+    def strings_at(self, col: str, rows: Sequence[int]) -> List[str]:
+        """
+        Decode a few rows of a string column.
+        """
+        ends = self.column(col)
+        out = []
+        with open(self._path(col) + ".bin", "rb") as f:
+            for r in rows:
+                start = int(ends[r - 1]) if r > 0 else 0
+                f.seek(start)
+                out.append(f.read(int(ends[r]) - start).decode("utf-8"))
+        return out
+
+    def append(self, values: Dict[str, object]):
+        """
+        Append rows; `values` maps every column to an array (strings: a list).
+        Caller holds the store lock.
+        """
+        n = len(self)
+        self.truncate(n)  # drop the tail of a torn append before writing after it
+        for col in self.strings:
+            heap = self._path(col) + ".bin"
+            encoded = [s.encode("utf-8") for s in values[col]]
+            base = os.path.getsize(heap) if os.path.exists(heap) else 0
+            ends = base + np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+            with open(heap, "ab") as f:
+                f.write(b"".join(encoded))
+            values = dict(values, **{col: ends})
+        for col, (dtype, width) in self.schema.items():
+            arr = np.ascontiguousarray(values[col], dtype=dtype)
+            with open(self._path(col), "ab") as f:
+                f.write(arr.tobytes())
+
+    def truncate(self, rows: int):
+        for col in self.schema:
+            path = self._path(col)
+            if not os.path.exists(path):
+                continue
+            if col in self.strings:
+                heap_end = int(self.column(col, rows)[rows - 1]) if rows else 0
+                heap = path + ".bin"
+                if os.path.exists(heap) and os.path.getsize(heap) > heap_end:
+                    os.truncate(heap, heap_end)
+            size = rows * self._row_bytes(col)
+            if os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+
+# ------------------ Store ------------------ #
+
+class EvaluationStore:
+    """
+    Append evaluations with add() (buffered; flush() writes them) and query
+    them with the aggregate methods below.
+    """
+
+    def __init__(self, directory: str, model_tag: Optional[str] = None, dtype: str = "float16",
+                 flush_every: int = 256):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype {dtype!r} (choose from {', '.join(VECTOR_DTYPES)})")
+        self.directory = directory
+        self.flush_every = max(1, flush_every)
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._dict_path = os.path.join(directory, "dicts.json")
+        self._lock = threading.Lock()
+        self._pending: List[Dict] = []
+        os.makedirs(directory, exist_ok=True)
+
+        self.meta: Dict = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if model_tag and self.meta.get("model") != model_tag:
+                raise ValueError(
+                    f"Evaluation store at {directory} holds {self.meta.get('model')!r} embeddings, not {model_tag!r}"
+                )
+        else:
+            self.meta = {"model": model_tag, "dtype": dtype, "dim": None}
+        self._open_tables()
+
+    def _open_tables(self):
+        dim = self.meta.get("dim") or 0
+        vec_dtype = np.int8 if self.meta["dtype"] == "int8" else np.float16
+        self.records = _Table(self.directory, "records", {
+            "score": np.float32,
+            "lang": np.uint8,
+            "model": np.uint16,
+            "n_topics": np.uint32,
+        }, strings=("source",))
+        self.topics = _Table(self.directory, "topics", {
+            "record": np.uint64,
+            "similarity": np.float16,
+            "covered": np.bool_,
+            "lang": np.uint8,
+            "model": np.uint16,
+            "hash": np.uint64,
+            "scale": np.float32,
+            "vector": (vec_dtype, dim),
+        }, strings=("text",))
+
+    def _dicts(self) -> Dict[str, List[str]]:
+        if os.path.exists(self._dict_path):
+            with open(self._dict_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"lang": [], "model": []}
+
+    def _code(self, name: str, value: Optional[str]) -> Optional[int]:
+        values = self._dicts()[name]
+        return values.index(value) if value in values else None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    # ---- Writing ----
+
+    def add(self, result: Dict, topic_embs: Optional[np.ndarray], source: Optional[str] = None,
+            model: Optional[str] = None):
+        """
+        Queue one analysis result (analyze_context_full output with coverage)
+        and the embeddings of its prompt sentences, one row per coverage entry.
+        """
+        coverage = result.get("coverage") or []
+        if coverage and (topic_embs is None or len(topic_embs) != len(coverage)):
+            raise ValueError("topic_embs must have one row per coverage entry")
+        self._pending.append({
+            "source": "" if source is None else str(source),
+            "model": model or "",
+            "lang": result.get("detected_user_lang") or "",
+            "score": float(result.get("quality_score", 0.0)),
+            "coverage": coverage,
+            "embs": topic_embs if coverage else None,
+        })
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def _quantize(self, embs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        vecs = normalize_rows(embs)
+        if self.meta["dtype"] == "int8":
+            scale = np.abs(vecs).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            return np.rint(vecs / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+        return vecs.astype(np.float16), np.ones(len(vecs), dtype=np.float32)
+
+    def flush(self):
+        """
+        Write queued evaluations. Safe with several writer processes.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with self._lock, open(os.path.join(self.directory, ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                self._write(pending)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, pending: List[Dict]):
+        # Another process may have set dim / dictionaries since we opened the store
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+        embs = next((p["embs"] for p in pending if p["embs"] is not None), None)
+        if not os.path.exists(self._meta_path) or (not self.meta.get("dim") and embs is not None):
+            if embs is not None:
+                self.meta["dim"] = int(np.asarray(embs).shape[1])
+            _write_json(self._meta_path, self.meta)
+        self._open_tables()
+        self._drop_orphan_topics()
+
+        dicts = self._dicts()
+        for name in ("lang", "model"):
+            for p in pending:
+                if p[name] not in dicts[name]:
+                    dicts[name].append(p[name])
+        _write_json(self._dict_path, dicts)
+        codes = {name: {v: i for i, v in enumerate(dicts[name])} for name in ("lang", "model")}
+
+        first = len(self.records)
+        topics: Dict[str, list] = {c: [] for c in ("record", "similarity", "covered", "lang", "model", "hash", "text")}
+        vectors, scales = [], []
+        for i, p in enumerate(pending):
+            for c in p["coverage"]:
+                topics["record"].append(first + i)
+                topics["similarity"].append(c["max_similarity"])
+                topics["covered"].append(c["covered"])
+                topics["lang"].append(codes["lang"][p["lang"]])
+                topics["model"].append(codes["model"][p["model"]])
+                topics["hash"].append(topic_hash(c["topic"]))
+                topics["text"].append(c["topic"])
+            if p["embs"] is not None:
+                q, s = self._quantize(np.asarray(p["embs"], dtype=np.float32))
+                vectors.append(q)
+                scales.append(s)
+
+        # Topics first: a crash in between leaves topics without a record row,
+        # which the next write drops before appending
+        if topics["record"]:
+            topics["vector"] = np.concatenate(vectors)
+            topics["scale"] = np.concatenate(scales)
+            self.topics.append(topics)
+        self.records.append({
+            "source": [p["source"] for p in pending],
+            "score": [p["score"] for p in pending],
+            "lang": [codes["lang"][p["lang"]] for p in pending],
+            "model": [codes["model"][p["model"]] for p in pending],
+            "n_topics": [len(p["coverage"]) for p in pending],
+        })
+
+    def _drop_orphan_topics(self):
+        rec = self.topics.column("record")
+        keep = int(np.searchsorted(rec, len(self.records)))
+        if keep < len(rec):
+            self.topics.truncate(keep)
+
+    def truncate_records(self, n: int):
+        """
+        Keep the first n evaluations (and their topics); used to roll back
+        rows written after a bulk run's last checkpoint.
+        """
+        self._pending = []
+        with self._lock, open(os.path.join(self.directory, ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                self.records.truncate(min(n, len(self.records)))
+                self._drop_orphan_topics()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    # ---- Queries ----
+
+    def _topic_mask(self, model: Optional[str], lang: Optional[str],
+                    missing_only: bool) -> Tuple[Optional[Callable[[slice], np.ndarray]], int]:
+        """
+        (row filter for one chunk of the topics table, rows to scan). The filter
+        is None when a filter value never occurs (the answer is empty).
+        """
+        codes = {}
+        for name, value in (("model", model), ("lang", lang)):
+            if value is not None:
+                code = self._code(name, value)
+                if code is None:
+                    return None, 0
+                codes[name] = code
+        covered = self.topics.column("covered")
+        cols = {name: self.topics.column(name) for name in codes}
+
+        def mask(sl: slice) -> np.ndarray:
+            m = ~np.asarray(covered[sl]) if missing_only else np.ones(sl.stop - sl.start, dtype=bool)
+            for name, code in codes.items():
+                m &= np.asarray(cols[name][sl]) == code
+            return m
+
+        return mask, len(covered)
+
+    def _vectors(self, sl: slice, m: np.ndarray) -> np.ndarray:
+        """
+        Dequantized, normalized float32 embeddings of the masked rows in sl.
+        """
+        vecs = np.asarray(self.topics.column("vector", sl.stop)[sl][m], dtype=np.float32)
+        if self.meta["dtype"] == "int8":
+            vecs *= np.asarray(self.topics.column("scale", sl.stop)[sl][m])[:, None]
+        return normalize_rows(vecs)
+
+    def missing_topics(self, model: Optional[str] = None, lang: Optional[str] = None, top: int = 20,
+                       min_seen: int = 1, chunk_rows: int = CHUNK_ROWS) -> List[Dict]:
+        """
+        Prompt topics most often missing from answers: per distinct topic, how
+        often it was asked (seen) and not covered (missing), most missing first.
+        """
+        mask, n = self._topic_mask(model, lang, missing_only=False)
+        if mask is None:
+            return []
+        hashes, covered, sims = (self.topics.column(c, n) for c in ("hash", "covered", "similarity"))
+
+        keys = np.empty(0, dtype=np.uint64)
+        first = np.empty(0, dtype=np.int64)
+        seen = np.empty(0, dtype=np.int64)
+        missing = np.empty(0, dtype=np.int64)
+        sim_sum = np.empty(0, dtype=np.float64)
+        for sl in _chunks(n, chunk_rows):
+            m = mask(sl)
+            rows = np.flatnonzero(m) + sl.start
+            # Merge this chunk into the running per-topic totals (accumulated keys come first,
+            # so return_index keeps the earliest row of each topic)
+            all_keys = np.concatenate([keys, np.asarray(hashes[sl])[m]])
+            keys, idx, inv = np.unique(all_keys, return_index=True, return_inverse=True)
+            first = np.concatenate([first, rows])[idx]
+            seen = np.bincount(inv, weights=np.concatenate([seen, np.ones(len(rows))]), minlength=len(keys)).astype(np.int64)
+            missing = np.bincount(
+                inv, weights=np.concatenate([missing, ~np.asarray(covered[sl])[m]]), minlength=len(keys)
+            ).astype(np.int64)
+            sim_sum = np.bincount(
+                inv, weights=np.concatenate([sim_sum, np.asarray(sims[sl])[m]]), minlength=len(keys)
+            )
+
+        keep = np.flatnonzero((seen >= min_seen) & (missing > 0))
+        order = keep[np.lexsort((-seen[keep], -missing[keep]))][:top]
+        texts = self.topics.strings_at("text", first[order].tolist())
+        return [
+            {
+                "topic": t,
+                "missing": int(missing[i]),
+                "seen": int(seen[i]),
+                "miss_rate": round(float(missing[i] / seen[i]), 4),
+                "mean_similarity": round(float(sim_sum[i] / seen[i]), 3),
+            }
+            for t, i in zip(texts, order)
+        ]
+
+    def score_distribution(self, by: str = "lang", model: Optional[str] = None,
+                           chunk_rows: int = CHUNK_ROWS) -> Dict[str, Dict]:
+        """
+        Quality-score distribution per language (or per model): exact count and
+        mean, percentiles and histogram at 0.1 resolution.
+        """
+        if by not in ("lang", "model"):
+            raise ValueError("by must be 'lang' or 'model'")
+        # Snapshot: rows first, then the dictionaries. Writers add dictionary
+        # entries before the rows that use them, so every code in the first n
+        # rows is known; rows appended during the scan are ignored.
+        n = len(self.records)
+        dicts = self._dicts()
+        names = dicts[by]
+        scores, groups = self.records.column("score"), self.records.column(by)
+        model_code = None
+        if model is not None:
+            if model not in dicts["model"]:
+                return {}
+            model_code = dicts["model"].index(model)
+        models = self.records.column("model")
+
+        hist = np.zeros(max(1, len(names)) * SCORE_BINS, dtype=np.int64)
+        totals = np.zeros(max(1, len(names)), dtype=np.float64)
+        for sl in _chunks(n, chunk_rows):
+            s = np.asarray(scores[sl], dtype=np.float64)
+            g = np.asarray(groups[sl], dtype=np.int64)
+            keep = g < len(names)  # guard against a code newer than the snapshot
+            if model_code is not None:
+                keep &= np.asarray(models[sl]) == model_code
+            s, g = s[keep], g[keep]
+            bins = np.clip(np.rint(s * 10), 0, SCORE_BINS - 1).astype(np.int64)
+            hist += np.bincount(g * SCORE_BINS + bins, minlength=len(hist))
+            totals += np.bincount(g, weights=s, minlength=len(totals))
+
+        out = {}
+        for code, name in enumerate(names):
+            h = hist[code * SCORE_BINS:(code + 1) * SCORE_BINS]
+            n = int(h.sum())
+            if not n:
+                continue
+            cum = np.cumsum(h)
+            pct = {f"p{q}": float(np.searchsorted(cum, q / 100 * n)) / 10 for q in (10, 50, 90)}
+            out[name or "unknown"] = {
+                "count": n,
+                "mean": round(float(totals[code] / n), 3),
+                **pct,
+                "histogram": {f"{b / 10:.1f}": int(c) for b, c in enumerate(h) if c},
+            }
+        return out
+
+    def nearest(self, query: np.ndarray, k: int = 10, model: Optional[str] = None, lang: Optional[str] = None,
+                missing_only: bool = False, chunk_rows: int = CHUNK_ROWS) -> List[Dict]:
+        """
+        The k stored topics most similar to a query embedding (cosine).
+        """
+        mask, n = self._topic_mask(model, lang, missing_only)
+        if mask is None or not self.meta.get("dim"):
+            return []
+        q = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        best_sims = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for sl in _chunks(n, chunk_rows):
+            m = mask(sl)
+            if not m.any():
+                continue
+            sims = self._vectors(sl, m) @ q
+            best_sims = np.concatenate([best_sims, sims])
+            best_rows = np.concatenate([best_rows, np.flatnonzero(m) + sl.start])
+            if len(best_sims) > k:
+                top = np.argpartition(-best_sims, k - 1)[:k]
+                best_sims, best_rows = best_sims[top], best_rows[top]
+
+        order = np.argsort(-best_sims)
+        return self._describe(best_rows[order].tolist(), {"similarity": best_sims[order].tolist()})
+
+    def cluster_topics(self, k: int = 20, iters: int = 5, model: Optional[str] = None, lang: Optional[str] = None,
+                       missing_only: bool = True, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> List[Dict]:
+        """
+        Group stored topics (by default only missing ones) by meaning: spherical
+        k-means over the embeddings, one streaming pass per iteration; every
+        topic joins its nearest centroid. Returns clusters by size, each with
+        the topic closest to its centroid as the label.
+        """
+        mask, n = self._topic_mask(model, lang, missing_only)
+        if mask is None or not self.meta.get("dim"):
+            return []
+        counts = [int(mask(sl).sum()) for sl in _chunks(n, chunk_rows)]
+        total = sum(counts)
+        if total == 0:
+            return []
+        k = min(k, total)
+
+        # Seed centroids with k distinct matching rows
+        rng = np.random.default_rng(seed)
+        picks = np.sort(rng.choice(total, size=k, replace=False))
+        seeds = []
+        offset = 0
+        for sl, c in zip(_chunks(n, chunk_rows), counts):
+            local = picks[(picks >= offset) & (picks < offset + c)] - offset
+            if len(local):
+                seeds.append(self._vectors(sl, mask(sl))[local])
+            offset += c
+        centroids = np.concatenate(seeds)
+
+        def assign(sl):
+            m = mask(sl)
+            vecs = self._vectors(sl, m)
+            sims = vecs @ centroids.T
+            labels = sims.argmax(axis=1)
+            return m, vecs, labels, sims[np.arange(len(labels)), labels]
+
+        for _ in range(iters):
+            sums = np.zeros_like(centroids)
+            for sl in _chunks(n, chunk_rows):
+                _, vecs, labels, _ = assign(sl)
+                if len(labels):
+                    order = np.argsort(labels, kind="stable")
+                    uniq, starts = np.unique(labels[order], return_index=True)
+                    sums[uniq] += np.add.reduceat(vecs[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1)
+            moved = norms > 0  # empty clusters keep their centroid
+            centroids[moved] = sums[moved] / norms[moved, None]
+
+        # Final pass: sizes, coverage stats and the most central topic per cluster
+        size = np.zeros(k, dtype=np.int64)
+        missing = np.zeros(k, dtype=np.int64)
+        sim_sum = np.zeros(k, dtype=np.float64)
+        label_sim = np.full(k, -np.inf)
+        label_row = np.zeros(k, dtype=np.int64)
+        covered, sims_col = self.topics.column("covered", n), self.topics.column("similarity", n)
+        for sl in _chunks(n, chunk_rows):
+            m, _, labels, central = assign(sl)
+            if not len(labels):
+                continue
+            rows = np.flatnonzero(m) + sl.start
+            size += np.bincount(labels, minlength=k)
+            missing += np.bincount(labels, weights=~np.asarray(covered[sl])[m], minlength=k).astype(np.int64)
+            sim_sum += np.bincount(labels, weights=np.asarray(sims_col[sl])[m], minlength=k)
+            best = np.full(k, -np.inf)
+            np.maximum.at(best, labels, central)
+            better = best > label_sim
+            hit = better[labels] & (central == best[labels])
+            label_row[labels[hit]] = rows[hit]
+            label_sim = np.maximum(label_sim, best)
+
+        used = np.flatnonzero(size)
+        used = used[np.argsort(-size[used], kind="stable")]
+        texts = self.topics.strings_at("text", label_row[used].tolist())
+        return [
+            {
+                "label": t,
+                "size": int(size[c]),
+                "missing": int(missing[c]),
+                "mean_similarity": round(float(sim_sum[c] / size[c]), 3),
+            }
+            for t, c in zip(texts, used)
+        ]
+
+    def _describe(self, rows: List[int], extra: Dict[str, list]) -> List[Dict]:
+        if not rows:
+            return []
+        texts = self.topics.strings_at("text", rows)
+        rec = self.topics.column("record")
+        records = [int(rec[r]) for r in rows]
+        sources = self.records.strings_at("source", records)
+        dicts = self._dicts()
+        lang_col, model_col = self.topics.column("lang"), self.topics.column("model")
+        covered, sims = self.topics.column("covered"), self.topics.column("similarity")
+        out = []
+        for i, r in enumerate(rows):
+            out.append({
+                "topic": texts[i],
+                **{name: round(float(vals[i]), 4) for name, vals in extra.items()},
+                "covered": bool(covered[r]),
+                "max_similarity": round(float(sims[r]), 3),
+                "lang": dicts["lang"][int(lang_col[r])],
+                "model": dicts["model"][int(model_col[r])] or None,
+                "record": records[i],
+                "source": sources[i] or None,
+            })
+        return out
+
+    def summary(self) -> Dict:
+        dicts = self._dicts()
+        return {
+            "directory": self.directory,
+            "embedding_model": self.meta.get("model"),
+            "dtype": self.meta.get("dtype"),
+            "dim": self.meta.get("dim"),
+            "records": len(self.records),
+            "topics": len(self.topics),
+            "languages": dicts["lang"],
+            "models": [m for m in dicts["model"] if m],
+            "bytes": sum(e.stat().st_size for e in os.scandir(self.directory) if e.is_file()),
+        }
+
+
+def _write_json(path: str, data: Dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ------------------ CLI ------------------ #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.evalstore", description="Corpus-level queries over stored evaluations.")
+    parser.add_argument("store", help="evaluation store directory (see app.bulk --store)")
+    parser.add_argument("--model", help="only evaluations of answers from this model")
+    parser.add_argument("--lang", help="only prompts in this language")
+    sub = parser.add_subparsers(dest="query", required=True)
+    sub.add_parser("summary", help="row counts, languages, models")
+    p = sub.add_parser("missing", help="most frequently missing prompt topics")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--min-seen", type=int, default=1, help="ignore topics asked fewer times")
+    p = sub.add_parser("scores", help="quality-score distribution per language or model")
+    p.add_argument("--by", choices=("lang", "model"), default="lang")
+    p = sub.add_parser("clusters", help="cluster topics by meaning")
+    p.add_argument("--k", type=int, default=20)
+    p.add_argument("--iters", type=int, default=5)
+    p.add_argument("--all-topics", action="store_true", help="cluster covered topics too")
+    p = sub.add_parser("nearest", help="stored topics closest to a text (loads the encoder)")
+    p.add_argument("text")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--missing-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.store, "meta.json")):
+        raise SystemExit(f"No evaluation store at {args.store}")
+    store = EvaluationStore(args.store)
+    if args.query == "summary":
+        out = store.summary()
+    elif args.query == "missing":
+        out = store.missing_topics(args.model, args.lang, top=args.top, min_seen=args.min_seen)
+    elif args.query == "scores":
+        out = store.score_distribution(by=args.by, model=args.model)
+    elif args.query == "clusters":
+        out = store.cluster_topics(args.k, args.iters, args.model, args.lang, missing_only=not args.all_topics)
+    else:
+        import app.analyzer as analyzer
+
+        query = analyzer.compute_embeddings([args.text])[0]
+        out = store.nearest(query, args.k, args.model, args.lang, missing_only=args.missing_only)
+    json.dump(out, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# app/instructions.py
+"""
+Embedding-based detection of instruction-only prompt sentences.
+
+Sentences like "Explain with an example", "उदाहरण के साथ समझाइए" or "Explica
+paso a paso" ask for a form of answer, not a topic, and must not be scored
+as missing. The fragment list in the analyzer only catches exact English
+wording; this classifier compares each prompt sentence with a multilingual
+set of instruction prototypes instead.
+
+Prototypes come from instruction_prototypes.json ({lang: [sentence, ...]},
+override with TOTEM_INSTRUCTION_PROTOTYPES). They are embedded once per
+process; classifying a prompt is then one matrix multiply of its sentence
+embeddings (already computed for scoring) against the prototypes.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+from app.scoring import normalize_rows
+
+DEFAULT_PROTOTYPES_PATH = os.path.join(os.path.dirname(__file__), "instruction_prototypes.json")
+INSTRUCTION_PROTOTYPES_PATH = os.getenv("TOTEM_INSTRUCTION_PROTOTYPES") or DEFAULT_PROTOTYPES_PATH
+# Opt-in: the threshold has not been calibrated against labelled prompts yet,
+# and a false positive silently removes a topic from coverage
+INSTRUCTION_CLASSIFIER = os.getenv("TOTEM_INSTRUCTION_CLASSIFIER", "0") == "1"
+INSTRUCTION_THRESHOLD = float(os.getenv("TOTEM_INSTRUCTION_THRESHOLD", "0.8"))  # cosine to the nearest prototype
+
+
+@lru_cache(maxsize=None)
+def load_prototypes(path: str = INSTRUCTION_PROTOTYPES_PATH) -> List[str]:
+    """
+    All prototype sentences of the data file, in file order.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [s for sentences in data.values() for s in sentences]
+
+
+def prototypes_digest(path: str = INSTRUCTION_PROTOTYPES_PATH) -> str:
+    """
+    Short content hash of the prototype set (part of result-cache keys).
+    """
+    raw = "\n".join(load_prototypes(path)).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+class InstructionClassifier:
+    """
+    Nearest-prototype classifier: a sentence is an instruction when its cosine
+    similarity to some prototype reaches the threshold.
+    """
+
+    def __init__(self, prototype_embs: np.ndarray, threshold: float = INSTRUCTION_THRESHOLD):
+        self.prototypes = normalize_rows(prototype_embs)
+        self.threshold = threshold
+
+    def scores(self, embs: np.ndarray) -> np.ndarray:
+        """
+        Similarity of each sentence to its nearest prototype.
+        """
+        return (normalize_rows(embs) @ self.prototypes.T).max(axis=1)
+
+    def is_instruction(self, embs: np.ndarray) -> np.ndarray:
+        return self.scores(embs) >= self.threshold
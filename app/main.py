@@ -1,10 +1,153 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+
+PROCESS_START = time.perf_counter()  # before the heavy imports below, for cold-start reporting
+
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from app.analyzer import analyze_context_full
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Dict, List, Optional
+from app.analyzer import (
+    analysis_config,
+    analyze_context_full,
+    analyze_context_many,
+    embedding_cache_stats,
+    embedding_batcher_stats,
+    model_status,
+    warmup,
+)
+from app import serving
+from app.metrics import (
+    ADMISSION_WAIT_SECONDS,
+    IN_FLIGHT,
+    METRICS_ENABLED,
+    REQUEST_SECONDS,
+    CallbackGauge,
+    render_prometheus,
+)
+from app.models import AnalyzeManyResponse, AnalyzeResponse, ResultField
+from app.session import AnalysisSession
+from app.translation import TRANSLATION_ENABLED, translation_stats
+from app.utils.admission import AdmissionController, Overloaded
+from app.utils.langutils import langid_cache_stats, preload_translator
+from app.utils.ndjson import NDJSONDuplexResponse
+from app.utils.resultcache import SingleFlight, make_backend, make_key, normalize_input
+
+logger = logging.getLogger("uvicorn.error")
+
+WARMUP_ON_STARTUP = os.getenv("TOTEM_WARMUP", "1") != "0"
+_first_request_done = False
+
+# Admission control for analysis requests: bounded executor + bounded wait queue
+ANALYZE_CONCURRENCY = int(os.getenv("TOTEM_ANALYZE_CONCURRENCY", "0"))  # 0 => one slot per core of this worker
+ANALYZE_MAX_QUEUE = int(os.getenv("TOTEM_ANALYZE_MAX_QUEUE", "64"))
+ANALYZE_QUEUE_TIMEOUT_MS = float(os.getenv("TOTEM_ANALYZE_QUEUE_TIMEOUT_MS", "2000"))
+ADMISSION: Optional[AdmissionController] = None
+
+
+def _get_admission() -> AdmissionController:
+    # Created on first use so that, under gunicorn, it is sized after fork
+    global ADMISSION
+    if ADMISSION is None:
+        ADMISSION = AdmissionController(
+            ANALYZE_CONCURRENCY or serving.threads_per_worker(serving.WORKERS),
+            max_queue=ANALYZE_MAX_QUEUE,
+            timeout_s=ANALYZE_QUEUE_TIMEOUT_MS / 1000.0,
+            observe_wait=ADMISSION_WAIT_SECONDS.observe if METRICS_ENABLED else None,
+            name="analyze",
+        )
+    return ADMISSION
+
+
+# Whole-response cache for /analyze: "memory" (per process), "file" (shared by workers) or "off"
+RESULT_CACHE_BACKEND = os.getenv("TOTEM_RESULT_CACHE", "memory")
+RESULT_CACHE_SIZE = int(os.getenv("TOTEM_RESULT_CACHE_SIZE", "2048"))
+RESULT_CACHE_TTL_S = float(os.getenv("TOTEM_RESULT_CACHE_TTL_S", "600"))
+RESULT_CACHE_DIR = os.getenv("TOTEM_RESULT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "totem-results")
+RESULT_CACHE = make_backend(RESULT_CACHE_BACKEND, RESULT_CACHE_SIZE, RESULT_CACHE_TTL_S, RESULT_CACHE_DIR)
+RESULT_CACHE_STATS = {"hit": 0, "miss": 0, "coalesced": 0}
+_ANALYZE_FLIGHTS = SingleFlight()
+
+
+def result_cache_stats():
+    if RESULT_CACHE is None:
+        return None
+    return dict(RESULT_CACHE_STATS, in_flight=len(_ANALYZE_FLIGHTS), **RESULT_CACHE.stats())
+
+
+# NDJSON batch endpoint (/analyze/stream)
+STREAM_CONCURRENCY = int(os.getenv("TOTEM_STREAM_CONCURRENCY", "0"))  # 0 => analysis slots of this worker
+STREAM_MAX_LINE_BYTES = int(os.getenv("TOTEM_STREAM_MAX_LINE_BYTES", str(1 << 20)))
+
+
+CallbackGauge(
+    "totem_result_cache_requests_total", "/analyze requests by result-cache outcome",
+    lambda: {(k,): v for k, v in RESULT_CACHE_STATS.items()} if RESULT_CACHE is not None else None,
+    labelnames=("outcome",), kind="counter",
+)
+CallbackGauge(
+    "totem_admission_queue_depth", "Analysis requests waiting for a worker slot",
+    lambda: ADMISSION.queue_depth if ADMISSION is not None else None,
+)
+CallbackGauge(
+    "totem_admission_running", "Analysis requests currently running",
+    lambda: ADMISSION.running if ADMISSION is not None else None,
+)
+CallbackGauge(
+    "totem_admission_rejected_total", "Analysis requests rejected by admission control",
+    lambda: {
+        ("queue_full",): ADMISSION.stats["rejected_queue_full"],
+        ("deadline",): ADMISSION.stats["rejected_deadline"],
+    } if ADMISSION is not None else None,
+    labelnames=("reason",), kind="counter",
+)
+
+
+def _warmup_and_log():
+    try:
+        info = warmup()
+    except Exception:
+        logger.exception("Model warmup failed")
+        return
+    logger.info(
+        "Model ready: cold start %.2fs (load %.2fs, warmup %.2fs)",
+        time.perf_counter() - PROCESS_START, info["load_seconds"], info["warmup_seconds"],
+    )
+    if TRANSLATION_ENABLED:
+        # No-op for pipelines the gunicorn master already loaded before fork
+        for lang in serving.PRELOAD_TRANSLATION_LANGS:
+            try:
+                preload_translator(lang)
+            except Exception:
+                logger.exception("Could not load en->%s translation pipeline", lang)
+
+
+def _log_first_request(started: float):
+    global _first_request_done
+    if not _first_request_done:
+        _first_request_done = True
+        logger.info("First analysis request took %.1f ms", (time.perf_counter() - started) * 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /healthz answers while the model loads;
+    # /readyz flips to 200 once the encoder is loaded and warmed.
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=_warmup_and_log, name="model-warmup", daemon=True).start()
+    yield
 
-app = FastAPI(title="Totem AI Context Analyzer")
+
+app = FastAPI(title="Totem AI Context Analyzer", lifespan=lifespan)
 
 # Allow local Streamlit or other hosts to call
 app.add_middleware(
@@ -15,20 +158,280 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    # Queue full => 429; waited past the deadline => 503. Both say when to retry.
+    status = 429 if exc.reason == "queue_full" else 503
+    return JSONResponse(
+        status_code=status,
+        content={"detail": f"Server busy ({exc.reason}), retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    started = time.perf_counter()
+    IN_FLIGHT.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        path = getattr(route, "path", "other")  # unmatched paths share one label
+        REQUEST_SECONDS.labels(path, str(status)).observe(time.perf_counter() - started)
+
 class AnalyzeRequest(BaseModel):
     user_prompt: str
     ai_response: str
     output_language: str = "auto"  # 'auto' or language code like 'en', 'hi'
+    fields: Optional[List[ResultField]] = None  # sections to build; None = all
+    include_answer: bool = True     # echo ai_response inside improved_answer
+
+class AnalyzeManyRequest(BaseModel):
+    user_prompt: str
+    responses: List[str]            # candidate answers to grade against the same prompt
+    output_language: str = "auto"
+    fields: Optional[List[ResultField]] = None
+    include_answer: bool = True
+
+async def _cache_io(fn, *args):
+    # File reads/writes (and pruning) must not stall the event loop
+    if RESULT_CACHE.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
 
-@app.post("/analyze")
-def analyze(req: AnalyzeRequest):
-    result = analyze_context_full(
-        user_prompt=req.user_prompt,
-        ai_response=req.ai_response,
-        user_lang=req.output_language
+async def _analyze_cached(req: AnalyzeRequest, stage_ms, response: Optional[Response] = None) -> dict:
+    """
+    Result cache + single-flight in front of analyze_context_full.
+    Sets X-Cache on `response` to HIT, MISS or COALESCED (an identical request
+    was already running).
+    """
+    fields = sorted(set(req.fields)) if req.fields is not None else None
+    run = lambda: _get_admission().run(
+        analyze_context_full, req.user_prompt, req.ai_response, req.output_language, stage_ms,
+        fields, req.include_answer,
     )
+    if RESULT_CACHE is None:
+        return await run()
+
+    # coverage[].topic_span are offsets into the prompt exactly as sent, so
+    # results that carry them can only be shared by byte-identical prompts.
+    # Likewise for the answer when its text comes back (improved_answer echo,
+    # coverage[].best_match): an NFD answer must not get NFC text.
+    wants = lambda f: fields is None or f in fields
+    prompt_key = req.user_prompt if wants("coverage") else normalize_input(req.user_prompt)
+    echoes_answer = wants("coverage") or (req.include_answer and wants("improved_answer"))
+    answer_key = req.ai_response if echoes_answer else normalize_input(req.ai_response)
+    key = make_key(
+        prompt_key, answer_key,
+        req.output_language or "auto", fields, req.include_answer, analysis_config(),
+    )
+    result = await _cache_io(RESULT_CACHE.get, key)
+    if result is not None:
+        status = "hit"
+    else:
+        async def compute():
+            out = await run()
+            await _cache_io(RESULT_CACHE.set, key, out)
+            return out
+
+        result, shared = await _ANALYZE_FLIGHTS.do(key, compute)
+        status = "coalesced" if shared else "miss"
+
+    RESULT_CACHE_STATS[status] += 1
+    if response is not None:
+        response.headers["X-Cache"] = status.upper()
+    return dict(result)  # shallow copy: the caller may add keys
+
+# Sections not built (see "fields") are unset and left out of the JSON;
+# explicit nulls inside built sections are kept.
+@app.post("/analyze", response_model=AnalyzeResponse, response_model_exclude_unset=True)
+async def analyze(req: AnalyzeRequest, response: Response, timings: bool = False):
+    started = time.perf_counter()
+    stage_ms = {} if timings else None
+    result = await _analyze_cached(req, stage_ms, response)
+    _log_first_request(started)
+    if timings:
+        # ?timings=true => per-stage latency block (ms). Stages only appear when
+        # this request ran the analysis; "cache" says whether it did.
+        result["timings"] = dict(
+            stage_ms,
+            total=round((time.perf_counter() - started) * 1000, 3),
+            cache=response.headers.get("X-Cache", "off").lower(),
+        )
     return result
 
+@app.post("/analyze_many", response_model=AnalyzeManyResponse, response_model_exclude_unset=True)
+async def analyze_many(req: AnalyzeManyRequest):
+    started = time.perf_counter()
+    result = await _get_admission().run(
+        analyze_context_many, req.user_prompt, req.responses, req.output_language,
+        req.fields, req.include_answer,
+    )
+    _log_first_request(started)
+    return result
+
+async def _stream_record(index: int, line: Optional[bytes]) -> Dict:
+    """
+    One /analyze/stream output line: {"index", "result"} or {"index", "error"}.
+    """
+    if line is None:
+        return {"index": index, "error": {"status": 413, "detail": f"Line longer than {STREAM_MAX_LINE_BYTES} bytes"}}
+    try:
+        req = AnalyzeRequest.model_validate_json(line)
+    except ValidationError as e:
+        return {"index": index, "error": {"status": 422, "detail": json.loads(e.json(include_url=False))}}
+    try:
+        result = await _analyze_cached(req, None)
+    except Overloaded as e:
+        status = 429 if e.reason == "queue_full" else 503
+        return {"index": index, "error": {"status": status, "detail": f"Server busy ({e.reason})", "retry_after": e.retry_after}}
+    except Exception:
+        logger.exception("Stream record %d failed", index)
+        return {"index": index, "error": {"status": 500, "detail": "Analysis failed"}}
+    return {"index": index, "result": result}
+
+async def _stream_results(lines: AsyncIterator[Optional[bytes]]) -> AsyncIterator[Dict]:
+    """
+    Schedules records as they are read, at most STREAM_CONCURRENCY at a time,
+    and yields each output line as soon as it is ready. A slot is only freed
+    once its line has been sent, so a slow reader also stops new reads; memory
+    stays bounded by the window, not the batch.
+    """
+    slots = asyncio.Semaphore(STREAM_CONCURRENCY or _get_admission().max_concurrency)
+    ready: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+
+    async def run(index: int, line: Optional[bytes]):
+        ready.put_nowait(await _stream_record(index, line))
+
+    async def feed():
+        index = 0
+        async for line in lines:
+            await slots.acquire()
+            task = asyncio.ensure_future(run(index, line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            index += 1
+        return index
+
+    feeder = asyncio.ensure_future(feed())
+    getter = None
+    sent = errors = 0
+    try:
+        while not (feeder.done() and sent == feeder.result()):
+            getter = asyncio.ensure_future(ready.get())
+            if not feeder.done():
+                await asyncio.wait({getter, feeder}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    feeder.result()  # re-raise a failed body read
+                    continue
+            record = await getter
+            errors += "error" in record
+            sent += 1
+            yield record
+            slots.release()
+        yield {"done": True, "count": sent, "errors": errors}
+    finally:
+        feeder.cancel()
+        if getter is not None:
+            getter.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+# Body: one /analyze request per line. Response: one line per record as it
+# finishes, in completion order, then {"done": true, ...}.
+@app.post("/analyze/stream")
+async def analyze_stream():
+    return NDJSONDuplexResponse(_stream_results, max_line_bytes=STREAM_MAX_LINE_BYTES)
+
+async def _receive_object(ws: WebSocket, str_fields=()) -> Optional[Dict]:
+    """
+    Next message as a JSON object whose str_fields, when present, are strings.
+    Anything else closes the socket with 1003 (unsupported data) and returns None.
+    """
+    try:
+        msg = await ws.receive_json()
+    except ValueError:
+        msg = None
+    if not isinstance(msg, dict) or any(not isinstance(msg.get(k, ""), str) for k in str_fields):
+        await ws.close(code=1003, reason="Expected a JSON object with string " + ", ".join(str_fields))
+        return None
+    return msg
+
+@app.websocket("/analyze/session")
+async def analyze_session(ws: WebSocket):
+    """
+    Live coverage for a response that is still streaming.
+    First message: {"user_prompt": ..., "output_language": "auto"}.
+    Then {"delta": "..."} per chunk (answered with a live update) and finally
+    {"done": true} (optionally with a last "delta"), answered with the full
+    /analyze result plus "final": true before the socket is closed.
+    Work goes through admission control like /analyze: when the server is
+    busy the client gets {"error", "retry_after"} and the socket closes with
+    1013 (try again later).
+    """
+    await ws.accept()
+    admission = _get_admission()
+    try:
+        start = await _receive_object(ws, ("user_prompt", "output_language"))
+        if start is None:
+            return
+        session = await admission.run(
+            AnalysisSession, start.get("user_prompt", ""), start.get("output_language") or "auto"
+        )
+        await ws.send_json(session.snapshot())
+        while True:
+            msg = await _receive_object(ws, ("delta",))
+            if msg is None:
+                return
+            update = await admission.run(session.feed, msg.get("delta") or "")
+            if msg.get("done"):
+                result = await admission.run(session.finish)
+                await ws.send_json(dict(result, final=True))
+                await ws.close()
+                return
+            await ws.send_json(update)
+    except Overloaded as e:
+        await ws.send_json({"error": f"Server busy ({e.reason}), retry later", "retry_after": e.retry_after})
+        await ws.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process is up and serving HTTP
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: the encoder is loaded and warmed up
+    status = model_status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=dict(status, status="loading"))
+    return dict(status, status="ready")
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+def stats():
+    return {
+        "embedding_cache": embedding_cache_stats(),
+        "embedding_batcher": embedding_batcher_stats(),
+        "langid_cache": langid_cache_stats(),
+        "translation": translation_stats(),
+        "result_cache": result_cache_stats(),
+        "admission": ADMISSION.snapshot() if ADMISSION is not None else None,
+    }
+
 @app.get("/")
 def root():
     return {"status": "ok", "message": "Totem AI Context Analyzer API"}
@@ -0,0 +1,260 @@
+# app/metrics.py
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+No external client library: counters, gauges and histograms are plain Python
+objects guarded by a lock, rendered by `render_prometheus()` for GET /metrics.
+Set TOTEM_METRICS=0 to turn recording off; `stage()` then returns a shared
+no-op context manager, so the hot path pays almost nothing.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("TOTEM_METRICS", "1") != "0"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+TOKEN_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+_REGISTRY: List = []
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count", "lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _render_child(self, key, child):
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += n
+            le = _fmt_value(bound if bound == math.inf else float(bound))
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, ('le', le))} {cumulative}")
+        labels = _fmt_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_fmt_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """
+    Gauge whose value(s) are read at scrape time from `fn`.
+    fn returns a number, or a dict mapping label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn: Callable, labelnames: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, v in sorted(values.items()):
+            if v is not None:
+                lines.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}")
+        return lines
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------ Analyzer metrics ------------------ #
+
+STAGE_SECONDS = Histogram(
+    "totem_stage_seconds", "Latency of analyzer pipeline stages", labelnames=("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "totem_http_request_seconds", "HTTP request latency", labelnames=("path", "status")
+)
+IN_FLIGHT = Gauge("totem_http_in_flight_requests", "HTTP requests currently being served")
+SENTENCES_PER_REQUEST = Histogram(
+    "totem_sentences_per_request", "Sentences per analysis", labelnames=("side",), buckets=COUNT_BUCKETS
+)
+TOKENS_PER_REQUEST = Histogram(
+    "totem_tokens_per_request", "Whitespace tokens per analysis", labelnames=("side",), buckets=TOKEN_BUCKETS
+)
+ENCODE_BATCH_SIZE = Histogram(
+    "totem_encode_batch_size", "Sentences per encoder call", buckets=COUNT_BUCKETS
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "totem_admission_wait_seconds", "Time analysis requests waited for a free worker slot"
+)
+
+
+# ------------------ Stage timers ------------------ #
+
+_NULL_STAGE = nullcontext()
+
+
+class _StageTimer:
+    __slots__ = ("name", "timings", "t0")
+
+    def __init__(self, name: str, timings: Optional[Dict]):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        if METRICS_ENABLED:
+            STAGE_SECONDS.labels(self.name).observe(dt)
+        if self.timings is not None:
+            self.timings[self.name] = round(self.timings.get(self.name, 0.0) + dt * 1000.0, 3)
+        return False
+
+
+def stage(name: str, timings: Optional[Dict] = None):
+    """
+    Time a pipeline stage:  `with stage("embeddings", timings): ...`
+    Records into the stage histogram and, when given, adds milliseconds to `timings`.
+    """
+    if not METRICS_ENABLED and timings is None:
+        return _NULL_STAGE
+    return _StageTimer(name, timings)
+
+
+def observe_request_sizes(user_sentences: int, ai_sentences: int, user_tokens: int, ai_tokens: int):
+    if not METRICS_ENABLED:
+        return
+    SENTENCES_PER_REQUEST.labels("prompt").observe(user_sentences)
+    SENTENCES_PER_REQUEST.labels("response").observe(ai_sentences)
+    TOKENS_PER_REQUEST.labels("prompt").observe(user_tokens)
+    TOKENS_PER_REQUEST.labels("response").observe(ai_tokens)
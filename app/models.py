@@ -1,6 +1,6 @@
 # app/models.py
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional, Tuple, Union
 
 class MissingTopic(BaseModel):
     topic: str
@@ -9,11 +9,31 @@ class MissingTopic(BaseModel):
     suggestion_en: str
     suggestion_local: str
 
+class SentenceCoverage(BaseModel):
+    topic: str                          # prompt sentence
+    topic_span: Tuple[int, int]         # [start, end) offsets of the sentence in user_prompt
+    max_similarity: float
+    best_match_index: Optional[int]     # index of the AI sentence that covers it best
+    best_match: Optional[str]
+    covered: bool
+
+# Optional sections a request can ask for via "fields" (see analyzer.RESULT_FIELDS)
+ResultField = Literal["summary", "missing_topics", "follow_up_prompts", "improved_answer", "coverage"]
+
 class AnalyzeResponse(BaseModel):
+    # Sections left out by "fields" are omitted from the JSON, not sent as null
     detected_user_lang: str
     output_language: str
-    summary: str
     quality_score: float
-    missing_topics: List[MissingTopic]
-    follow_up_prompts: List[str]
-    improved_answer: Optional[str]
+    summary: Optional[str] = None
+    missing_topics: Optional[List[MissingTopic]] = None
+    follow_up_prompts: Optional[List[str]] = None
+    improved_answer: Optional[str] = None
+    coverage: Optional[List[SentenceCoverage]] = None
+    timings: Optional[Dict[str, Union[float, str]]] = None  # per-stage ms + "cache", only with ?timings=true
+
+class AnalyzeManyResponse(BaseModel):
+    detected_user_lang: str
+    output_language: str
+    results: List[AnalyzeResponse]  # one per candidate, in request order
+    ranking: List[int]              # candidate indices, best quality_score first
@@ -0,0 +1,186 @@
+# app/scoring.py
+"""
+Vectorized coverage scoring.
+
+One pass over a prompt x response similarity matrix gives everything the
+analyzer needs: best similarity per prompt sentence, which AI sentence it
+aligns to, which prompt sentences are missing, and the 0-10 quality score.
+Embeddings are L2-normalized once, so the matrix is a single float32 matmul.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_rows(embs) -> np.ndarray:
+    """
+    L2-normalize each row (float32). Zero rows stay zero.
+    """
+    x = np.asarray(embs, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[None, :]
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def quality_from_max(max_sim: np.ndarray) -> np.ndarray:
+    """
+    Quality score(s) 0-10 from best-per-prompt-sentence similarities (axis 0 = prompt sentences).
+    """
+    if max_sim.shape[0] == 0:
+        return np.zeros(max_sim.shape[1:], dtype=np.float64)
+    avg = max_sim.mean(axis=0, dtype=np.float64)
+    return np.round(np.clip(avg, 0.0, 1.0) * 10.0, 2)
+
+
+def score_coverage(user_embs, ai_embs, threshold: float) -> Dict:
+    """
+    Coverage of one response.
+    Returns arrays over prompt sentences: max_similarity, best_match (AI sentence
+    index) and missing (bool), plus the scalar quality_score.
+    """
+    sims = normalize_rows(user_embs) @ normalize_rows(ai_embs).T
+    best = sims.argmax(axis=1)
+    max_sim = sims[np.arange(sims.shape[0]), best]
+    return {
+        "max_similarity": max_sim,
+        "best_match": best,
+        "missing": max_sim < threshold,
+        "quality_score": float(quality_from_max(max_sim)),
+    }
+
+
+def score_coverage_segments(user_embs, ai_embs, lengths: List[int], threshold: float) -> List[Dict]:
+    """
+    Coverage of several responses whose sentences are stacked in ai_embs
+    (response j owns the next lengths[j] rows; every length must be > 0).
+    One matmul for all responses; per-response max / argmax via reduceat.
+    Returns one score_coverage-shaped dict per response.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    sims = normalize_rows(user_embs) @ normalize_rows(ai_embs).T      # (n_user, total)
+
+    max_sim = np.maximum.reduceat(sims, offsets, axis=1)               # (n_user, n_resp)
+    # First column reaching the segment max, expressed relative to its segment
+    col = np.arange(sims.shape[1])
+    is_max = sims >= np.repeat(max_sim, lengths, axis=1)
+    first = np.minimum.reduceat(np.where(is_max, col, sims.shape[1]), offsets, axis=1)
+    best = first - offsets
+
+    missing = max_sim < threshold
+    quality = quality_from_max(max_sim)
+    return [
+        {
+            "max_similarity": max_sim[:, j],
+            "best_match": best[:, j],
+            "missing": missing[:, j],
+            "quality_score": float(quality[j]),
+        }
+        for j in range(len(lengths))
+    ]
+
+
+class RunningCoverage:
+    """
+    Streaming coverage: feed response embeddings chunk by chunk and keep only a
+    running max / argmax per prompt sentence, so memory does not grow with the
+    response. result() matches score_coverage() on the concatenated chunks
+    (ties keep the earliest sentence) and adds best_match_text.
+    """
+
+    def __init__(self, user_embs, threshold: float):
+        self.user = normalize_rows(user_embs)
+        self.threshold = threshold
+        n = self.user.shape[0]
+        self.max_sim = np.full(n, -np.inf, dtype=np.float32)
+        self.best = np.zeros(n, dtype=np.int64)
+        self.best_text: List = [None] * n
+        self.seen = 0
+
+    def update(self, ai_embs, sentences: List[str]):
+        sims = self.user @ normalize_rows(ai_embs).T
+        idx = sims.argmax(axis=1)
+        vals = sims[np.arange(sims.shape[0]), idx]
+        better = vals > self.max_sim
+        if better.any():
+            self.max_sim[better] = vals[better]
+            self.best[better] = idx[better] + self.seen
+            for i in np.flatnonzero(better):
+                self.best_text[i] = sentences[idx[i]]
+        self.seen += sims.shape[1]
+
+    def result(self) -> Dict:
+        max_sim = self.max_sim.copy()
+        return {
+            "max_similarity": max_sim,
+            "best_match": self.best.copy(),
+            "best_match_text": list(self.best_text),
+            "missing": max_sim < self.threshold,
+            "quality_score": float(quality_from_max(max_sim)),
+        }
+
+
+def ann_available() -> bool:
+    try:
+        import faiss  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class AnnCoverage:
+    """
+    Same interface as RunningCoverage, backed by an approximate nearest-neighbour
+    index (faiss HNSW, inner product on normalized vectors) over the response
+    sentences. Keeps every response vector, so only worth it for very long
+    responses; requires the optional `faiss-cpu` package.
+
+    `start` continues an exact RunningCoverage over the sentences before the
+    switch; results merge both (ties keep the earlier, exact match). A prompt
+    sentence with no neighbour at all gets similarity 0 and best_match -1.
+    """
+
+    def __init__(self, user_embs, threshold: float, hnsw_m: int = 32,
+                 start: Optional[RunningCoverage] = None):
+        import faiss
+
+        self.user = normalize_rows(user_embs)
+        self.threshold = threshold
+        self.index = faiss.IndexHNSWFlat(self.user.shape[1], hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        self.sentences: List[str] = []
+        self.start = start
+        self.offset = start.seen if start is not None else 0
+        self.seen = self.offset
+
+    def update(self, ai_embs, sentences: List[str]):
+        self.index.add(normalize_rows(ai_embs))
+        self.sentences.extend(sentences)
+        self.seen += len(sentences)
+
+    def result(self) -> Dict:
+        n = self.user.shape[0]
+        if self.sentences:
+            sims, idx = self.index.search(self.user, 1)
+            best = idx[:, 0].astype(np.int64)
+        else:
+            sims, best = np.zeros((n, 1), dtype=np.float32), np.full(n, -1, dtype=np.int64)
+        found = best >= 0  # HNSW returns -1 when it finds no neighbour
+        max_sim = np.where(found, sims[:, 0], 0.0).astype(np.float32)
+        texts = [self.sentences[i] if i >= 0 else None for i in best]
+        best = np.where(found, best + self.offset, -1)
+
+        if self.start is not None and self.start.seen:
+            prior = self.start.result()
+            keep = (prior["max_similarity"] >= max_sim) | ~found
+            max_sim = np.where(keep, prior["max_similarity"], max_sim)
+            best = np.where(keep, prior["best_match"], best)
+            texts = [p if k else t for p, t, k in zip(prior["best_match_text"], texts, keep)]
+        return {
+            "max_similarity": max_sim,
+            "best_match": best,
+            "best_match_text": texts,
+            "missing": max_sim < self.threshold,
+            "quality_score": float(quality_from_max(max_sim)),
+        }
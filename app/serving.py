@@ -0,0 +1,86 @@
+# app/serving.py
+"""
+Multi-process serving with one shared copy of the model weights.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The gunicorn master imports the app and loads the encoder (and any translation
+pipelines listed in TOTEM_PRELOAD_TRANSLATION) *before* forking. Workers inherit
+the weights copy-on-write, so memory no longer grows with the worker count.
+Each worker then limits torch to its share of the cores so that
+workers x threads matches the machine instead of oversubscribing it.
+"""
+
+import gc
+import logging
+import os
+
+from app.utils.langutils import preload_translator
+
+logger = logging.getLogger("gunicorn.error")
+
+# Comma-separated target languages whose en->xx translation pipelines are loaded before fork
+PRELOAD_TRANSLATION_LANGS = [
+    lang.strip() for lang in os.getenv("TOTEM_PRELOAD_TRANSLATION", "").split(",") if lang.strip()
+]
+
+
+# Worker processes sharing this host; set in each worker by configure_worker()
+WORKERS = 1
+
+
+def threads_per_worker(workers: int) -> int:
+    """
+    Intra-op threads per process so that workers x threads == CPU cores.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def set_torch_threads(n: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(n)
+
+
+def preload_shared_models():
+    """
+    Load model weights in the parent process, right before workers are forked.
+    """
+    from app import analyzer
+
+    if analyzer.EMB_BACKEND == "torch":
+        # Keep the OpenMP pool idle in the parent: a pool that has already run
+        # threads does not survive fork and can hang the children.
+        set_torch_threads(1)
+        analyzer.get_encoder()
+        logger.info("Loaded %s before fork; workers share its weights", analyzer.EMB_MODEL_NAME)
+    else:
+        # ONNX Runtime sessions own thread pools that are not fork-safe
+        logger.info("Encoder backend %r is loaded per worker (not fork-safe)", analyzer.EMB_BACKEND)
+
+    from app.translation import TRANSLATION_ENABLED
+
+    if PRELOAD_TRANSLATION_LANGS and not TRANSLATION_ENABLED:
+        # No request path would use them; don't pin their weights in the master
+        logger.warning("TOTEM_PRELOAD_TRANSLATION is ignored: translation is off (TOTEM_TRANSLATION=0)")
+    else:
+        for lang in PRELOAD_TRANSLATION_LANGS:
+            preload_translator(lang)
+            logger.info("Loaded en->%s translation pipeline before fork", lang)
+
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers don't touch (and copy) the shared pages.
+    gc.freeze()
+
+
+def configure_worker(workers: int):
+    """
+    Called in each worker right after fork.
+    """
+    global WORKERS
+    WORKERS = workers
+    threads = threads_per_worker(workers)
+    set_torch_threads(threads)
+    logger.info("Worker %d using %d torch threads", os.getpid(), threads)
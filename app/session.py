@@ -0,0 +1,113 @@
+# app/session.py
+"""
+Incremental analysis of a response that is still being generated.
+
+    session = AnalysisSession(user_prompt, user_lang="auto")
+    session.feed("Machine learning is ")      # -> live update
+    session.feed("a field of AI. It learns")  # -> one new sentence scored
+    session.finish()                          # -> same dict as analyze_context_full
+
+The prompt is prepared and embedded once. Each delta is appended to a small
+pending tail; only sentences completed by the delta are split, embedded and
+folded into a running best match per prompt sentence, so the cost of a delta
+depends on the new text only, not on everything streamed so far.
+"""
+
+from typing import Dict, List, Optional
+
+from app import analyzer
+from app.metrics import stage
+from app.scoring import RunningCoverage
+from app.utils.textutils import last_sentence_end
+
+
+class AnalysisSession:
+    def __init__(self, user_prompt: str, user_lang: str = "auto"):
+        self.prompt = analyzer.prepare_prompt(user_prompt, user_lang)
+        self.acc: Optional[RunningCoverage] = None
+        if self.prompt["user_sentences"]:
+            with stage("embeddings"):
+                user_embs = analyzer.compute_embeddings(self.prompt["user_sentences"])
+            self.prompt, user_embs = analyzer.drop_instruction_sentences(self.prompt, user_embs)
+            self.acc = RunningCoverage(user_embs, analyzer.SIM_THRESHOLD)
+
+        self._parts: List[str] = []   # every delta, joined once in finish()
+        self._tail = ""               # text after the last sentence terminator
+        self._words = 0
+        self._in_word = False         # previous delta ended inside a word
+        self.finished = False
+
+    def _count_words(self, delta: str):
+        n = analyzer._count_words(delta)
+        if n and self._in_word and not delta[0].isspace():
+            n -= 1  # the first word continues the previous delta's last word
+        self._words += n
+        self._in_word = not delta[-1].isspace()
+
+    def _score(self, text: str):
+        sentences = analyzer.clean_sentences(text)
+        if not sentences or self.acc is None:
+            return
+        with stage("embeddings"):
+            embs = analyzer.compute_embeddings(sentences)
+        with stage("similarity"):
+            self.acc.update(embs, sentences)
+
+    def feed(self, delta: str) -> Dict:
+        """
+        Add a chunk of response text; returns the live coverage state.
+        """
+        if self.finished:
+            raise RuntimeError("session already finished")
+        if delta:
+            self._parts.append(delta)
+            self._count_words(delta)
+            buf = self._tail + delta
+            # The old tail has no terminator, so only the delta needs scanning
+            cut = last_sentence_end(buf, len(self._tail))
+            if cut >= 0:
+                self._score(buf[:cut])
+                buf = buf[cut:]
+            self._tail = buf
+        return self.snapshot()
+
+    def snapshot(self) -> Dict:
+        """
+        Quality score, missing topics and coverage over the sentences completed so
+        far. Cheap: proportional to the prompt, not to the streamed response.
+        """
+        prompt = self.prompt
+        out = {
+            "detected_user_lang": prompt["detected_user_lang"],
+            "output_language": prompt["output_language"],
+            "final": False,
+            "sentences_seen": self.acc.seen if self.acc is not None else 0,
+        }
+        if self.acc is None:
+            out.update(quality_score=0.0, missing_topics=[], coverage=[])
+            return out
+
+        cov = self.acc.result() if self.acc.seen else None
+        missing, _ = analyzer._detect_gaps(prompt["user_sentences"], cov, prompt["output_language"])
+        out.update(
+            quality_score=0.0 if cov is None else cov["quality_score"],
+            missing_topics=missing,
+            coverage=analyzer._coverage_field(prompt["user_sentences"], [], cov, prompt["user_spans"]),
+        )
+        return out
+
+    def finish(self) -> Dict:
+        """
+        Score the trailing unterminated sentence and return the full
+        analyze_context_full() result for the complete response.
+        """
+        if not self.finished:
+            self._score(self._tail)
+            self._tail = ""
+            self.finished = True
+
+        ai_response = "".join(self._parts)
+        if self.acc is None:
+            return analyzer._empty_prompt_result(self.prompt)
+        scored = self.acc.seen > 0 and self._words >= analyzer.MIN_AI_WORDS
+        return analyzer._build_result(self.prompt, ai_response, [], self.acc.result() if scored else None)
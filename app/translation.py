@@ -0,0 +1,101 @@
+# app/translation.py
+"""
+Machine translation of the analyzer's English output text (en -> hi/mr/es).
+
+All strings of one response go through `translate_many()` together. Cached
+translations are returned at once, the rest are queued on a per-language
+micro-batcher (so strings from concurrent requests share one pipeline call).
+A request waits at most TOTEM_TRANSLATION_BUDGET_MS; whatever is not
+translated by then comes back as None and the caller keeps its template
+text. Late translations still land in the cache for the next request.
+
+Off by default (TOTEM_TRANSLATION=1 to enable). Set
+TOTEM_TRANSLATION_MODEL_DIR to run from local model copies without network.
+"""
+
+import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+
+from app.metrics import Counter
+from app.utils.batching import MicroBatcher
+from app.utils.langutils import TRANSLATION_MODEL_DIR, TRANSLATION_MODELS, translate_batch
+from app.utils.transcache import TranslationCache
+
+TRANSLATION_ENABLED = os.getenv("TOTEM_TRANSLATION", "0") == "1"
+TRANSLATION_BUDGET_MS = float(os.getenv("TOTEM_TRANSLATION_BUDGET_MS", "300"))
+TRANSLATION_BATCH_MAX_WAIT_MS = float(os.getenv("TOTEM_TRANSLATION_BATCH_MAX_WAIT_MS", "5"))
+TRANSLATION_CACHE_SIZE = int(os.getenv("TOTEM_TRANSLATION_CACHE_SIZE", "20000"))
+TRANSLATION_CACHE_DIR = os.getenv("TOTEM_TRANSLATION_CACHE_DIR") or None
+
+TRANSLATION_CACHE = TranslationCache(
+    TRANSLATION_MODEL_DIR or "Helsinki-NLP/opus-mt",
+    max_items=max(1, TRANSLATION_CACHE_SIZE),
+    disk_dir=TRANSLATION_CACHE_DIR,
+)
+_BATCHERS: Dict[str, MicroBatcher] = {}
+
+TRANSLATION_FALLBACKS = Counter(
+    "totem_translation_fallbacks_total",
+    "Translation requests that fell back to template text",
+    labelnames=("lang", "reason"),
+)
+
+
+def translation_enabled(lang: str) -> bool:
+    return TRANSLATION_ENABLED and lang in TRANSLATION_MODELS
+
+
+def _get_batcher(lang: str) -> MicroBatcher:
+    batcher = _BATCHERS.get(lang)
+    if batcher is None:
+        batcher = _BATCHERS.setdefault(lang, MicroBatcher(
+            lambda texts: translate_batch(texts, lang),
+            max_wait_ms=TRANSLATION_BATCH_MAX_WAIT_MS,
+            max_batch_size=64,
+            name=f"translate-{lang}",
+        ))
+    return batcher
+
+
+def translate_many(texts: List[str], lang: str, budget_ms: Optional[float] = None) -> List[Optional[str]]:
+    """
+    Translate English texts to lang within the latency budget.
+    Returns one translation per text, None where none was ready in time.
+    """
+    if not texts or not translation_enabled(lang):
+        return [None] * len(texts)
+    budget = (TRANSLATION_BUDGET_MS if budget_ms is None else budget_ms) / 1000.0
+    deadline = time.perf_counter() + budget
+
+    found = TRANSLATION_CACHE.lookup(lang, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, found) if v is None))
+    if not missing:
+        return found
+
+    fut = _get_batcher(lang).submit(missing)
+
+    def _store(f):
+        if f.exception() is None:
+            TRANSLATION_CACHE.store(lang, missing, f.result())
+
+    fut.add_done_callback(_store)
+    try:
+        translated = dict(zip(missing, fut.result(timeout=max(0.0, deadline - time.perf_counter()))))
+    except FutureTimeout:
+        TRANSLATION_FALLBACKS.labels(lang, "budget").inc()
+        return found
+    except Exception:
+        TRANSLATION_FALLBACKS.labels(lang, "error").inc()
+        return found
+    return [v if v is not None else translated[t] for t, v in zip(texts, found)]
+
+
+def translation_stats() -> Optional[Dict]:
+    if not TRANSLATION_ENABLED:
+        return None
+    return {
+        "cache": TRANSLATION_CACHE.stats(),
+        "batchers": {lang: dict(b.stats) for lang, b in _BATCHERS.items()},
+    }
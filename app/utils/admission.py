@@ -0,0 +1,145 @@
+# app/utils/admission.py
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is not admitted: the queue is full ("queue_full") or
+    it waited longer than its deadline for a free slot ("deadline").
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded execution of blocking work from async handlers.
+
+    At most `max_concurrency` calls run at once, on a dedicated thread pool of
+    that size. Up to `max_queue` more wait for a slot; anything beyond that is
+    rejected immediately, and a waiter whose deadline passes before it gets a
+    slot is rejected too. Rejections carry a Retry-After estimate from the
+    recent service time and the current queue.
+
+    observe_wait(seconds) is called with each admitted request's queue wait.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int = 64,
+        timeout_s: float = 2.0,
+        observe_wait: Optional[Callable[[float], None]] = None,
+        name: str = "admission",
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.timeout_s = timeout_s
+        self.observe_wait = observe_wait
+        self.name = name
+        self.stats: Dict[str, int] = {"admitted": 0, "rejected_queue_full": 0, "rejected_deadline": 0}
+        self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix=name)
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._service_s = 0.0  # EWMA of run time
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the current queue is likely to have drained (at least 1).
+        """
+        backlog = (self._waiting + 1) / self.max_concurrency
+        return max(1, math.ceil(backlog * self._service_s))
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.stats["rejected_" + reason] += 1
+        raise Overloaded(reason, self.retry_after())
+
+    async def run(self, fn: Callable, *args, timeout_s: Optional[float] = None):
+        """
+        Run fn(*args) on the bounded pool once a slot is free.
+        Raises Overloaded instead of queueing without bound.
+        """
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        sem = self._sem
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+
+        if self._waiting + self._running >= self.max_concurrency + self.max_queue:
+            self._reject("queue_full")
+
+        enqueued = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        # Not wait_for(sem.acquire()): before Python 3.12 a timeout racing a
+        # successful acquire loses the permit for good
+        acquire = asyncio.ensure_future(sem.acquire())
+        try:
+            done, _ = await asyncio.wait({acquire}, timeout=timeout_s)
+        except BaseException:  # caller cancelled while queued
+            self._abandon(acquire, sem)
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not done:
+            self._abandon(acquire, sem)
+            self._reject("deadline")
+
+        started = time.perf_counter()
+        if self.observe_wait is not None:
+            self.observe_wait(started - enqueued)
+        with self._lock:
+            self._running += 1
+        fut = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        # Free the slot when the work is really done, even if the caller goes away first.
+        # asyncio runs done callbacks on the event loop, not in the executor thread.
+        fut.add_done_callback(lambda _: self._finished(sem, started))
+        return await asyncio.shield(fut)
+
+    @staticmethod
+    def _abandon(acquire: asyncio.Future, sem: asyncio.Semaphore):
+        # Stop waiting for a slot; give the permit back if the acquire won anyway
+        acquire.cancel()
+        acquire.add_done_callback(
+            lambda t: sem.release() if not t.cancelled() and t.exception() is None else None
+        )
+
+    def _finished(self, sem: asyncio.Semaphore, started: float):
+        sem.release()
+        took = time.perf_counter() - started
+        with self._lock:
+            self._running -= 1
+            self.stats["admitted"] += 1
+            self._service_s = took if self._service_s == 0.0 else 0.8 * self._service_s + 0.2 * took
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            out = dict(self.stats)
+            out.update(
+                max_concurrency=self.max_concurrency,
+                max_queue=self.max_queue,
+                queue_depth=self._waiting,
+                running=self._running,
+                service_seconds_ewma=round(self._service_s, 4),
+            )
+        return out
@@ -0,0 +1,124 @@
+# app/utils/batching.py
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def _default_gather(results, indices: List[int]):
+    return [results[i] for i in indices]
+
+
+class MicroBatcher:
+    """
+    Cross-request dynamic micro-batching.
+
+    Items submitted from many threads are collected for at most `max_wait_ms`
+    (or until `max_batch_size` items are pending), de-duplicated, sorted by
+    length so that neighbouring items pad to similar lengths, and run through
+    a single `batch_fn` call. Results are scattered back to each caller.
+
+    batch_fn(items) must return a sequence indexable by position.
+    gather(results, indices) picks one caller's results (defaults to a list).
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List], Sequence],
+        max_wait_ms: float = 5.0,
+        max_batch_size: int = 256,
+        gather: Optional[Callable] = None,
+        name: str = "batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.gather = gather or _default_gather
+        self.name = name
+        self.stats: Dict[str, int] = {"requests": 0, "batches": 0, "items": 0, "unique_items": 0}
+        self._lock = threading.Lock()
+        self._queue: Queue = Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+    # ------------------ Public API ------------------ #
+
+    def submit(self, items: List) -> Future:
+        """
+        Queue items for the next batch. Returns a Future with this caller's results
+        (None for an empty list).
+        """
+        fut: Future = Future()
+        if not items:
+            fut.set_result(None)
+            return fut
+        self._ensure_worker()
+        self._queue.put((list(items), fut))
+        return fut
+
+    def run(self, items: List):
+        """
+        Blocking helper: submit and wait for the results.
+        """
+        return self.submit(items).result()
+
+    # ------------------ Worker ------------------ #
+
+    def _ensure_worker(self):
+        with self._lock:
+            # After a fork the worker thread does not exist in the child.
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = Queue()
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        queue = self._queue
+        while True:
+            first = queue.get()
+            pending = [first]
+            count = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+
+            while count < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    req = queue.get(timeout=remaining)
+                except Empty:
+                    break
+                pending.append(req)
+                count += len(req[0])
+
+            self._process(pending)
+
+    def _process(self, pending):
+        # De-duplicate across callers, then sort by length (length buckets)
+        unique: Dict = {}
+        for items, _ in pending:
+            for it in items:
+                unique.setdefault(it, None)
+        ordered = sorted(unique, key=len)
+
+        self.stats["requests"] += len(pending)
+        self.stats["batches"] += 1
+        self.stats["items"] += sum(len(items) for items, _ in pending)
+        self.stats["unique_items"] += len(ordered)
+
+        try:
+            results = self.batch_fn(ordered)
+        except Exception as e:
+            for _, fut in pending:
+                fut.set_exception(e)
+            return
+
+        position = {it: i for i, it in enumerate(ordered)}
+        for items, fut in pending:
+            fut.set_result(self.gather(results, [position[it] for it in items]))
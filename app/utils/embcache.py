@@ -0,0 +1,225 @@
+# app/utils/embcache.py
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl  # POSIX only; used to serialise appends from several workers
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+def normalize_key_text(text: str) -> str:
+    """
+    Normalization used for cache keys: NFC + collapsed whitespace.
+    Case is kept because the embedding model is case sensitive.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class DiskVectorStore:
+    """
+    Append-only persistent tier:
+    - vectors.f32 : raw float32 rows, read through np.memmap
+    - index.tsv   : "<key>\\t<row>" lines
+    - meta.json   : model name + vector dimension
+    Survives restarts; several processes may append to the same directory.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        self.directory = directory
+        self.model_name = model_name
+        self.dim: Optional[int] = None
+        self._index: Dict[str, int] = {}
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._vec_path = os.path.join(directory, "vectors.f32")
+        self._idx_path = os.path.join(directory, "index.tsv")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._idx_offset = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_meta()
+        self._refresh_index()
+
+    def _load_meta(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            raise ValueError(
+                f"Embedding cache at {self.directory} belongs to model {meta.get('model')!r}, not {self.model_name!r}"
+            )
+        self.dim = int(meta["dim"])
+
+    def __len__(self):
+        return len(self._index)
+
+    def _refresh_index(self):
+        # Pick up rows appended by other processes since the last read.
+        # The index is append-only, so an unchanged size means nothing new.
+        try:
+            if os.path.getsize(self._idx_path) <= self._idx_offset:
+                return
+        except OSError:
+            return
+        with open(self._idx_path, "r", encoding="utf-8") as f:
+            f.seek(self._idx_offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partially written line; read it next time
+                self._idx_offset += len(line.encode("utf-8"))
+                key, _, row = line.rstrip("\n").partition("\t")
+                if row:
+                    self._index[key] = int(row)
+
+    def _vectors(self, needed_rows: int) -> np.memmap:
+        if self._mmap is None or self._mmap.shape[0] < needed_rows:
+            rows = os.path.getsize(self._vec_path) // (self.dim * 4)
+            self._mmap = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Vectors (copies) for keys, None where absent. The index is re-read at
+        most once per call, and only if another process appended to it.
+        """
+        with self._lock:
+            rows = [self._index.get(k) for k in keys]
+            if None in rows:
+                self._refresh_index()
+                rows = [self._index.get(k) if r is None else r for k, r in zip(keys, rows)]
+            if self.dim is None and any(r is not None for r in rows):
+                self._load_meta()  # another process created the store after we opened it
+            if self.dim is None:
+                return [None] * len(keys)
+            present = [r for r in rows if r is not None]
+            if not present:
+                return [None] * len(keys)
+            vectors = self._vectors(max(present) + 1)
+            return [None if r is None else np.array(vectors[r]) for r in rows]
+
+    def put_many(self, keys: List[str], vecs: np.ndarray):
+        if not keys:
+            return
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vecs.shape[1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+
+            with open(self._vec_path, "ab") as vf, open(self._idx_path, "a", encoding="utf-8") as xf:
+                if fcntl is not None:
+                    fcntl.flock(vf.fileno(), fcntl.LOCK_EX)
+                try:
+                    vf.seek(0, os.SEEK_END)
+                    start = vf.tell() // (self.dim * 4)
+                    vf.write(vecs.tobytes())
+                    vf.flush()
+                    xf.write("".join(f"{k}\t{start + i}\n" for i, k in enumerate(keys)))
+                    xf.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(vf.fileno(), fcntl.LOCK_UN)
+            self._refresh_index()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed sentence embedding cache.
+
+    Key = sha1(model name + normalized sentence). Bounded in-memory LRU in front
+    of an optional DiskVectorStore. Counters: hits (memory / disk), misses, evictions.
+    """
+
+    def __init__(self, model_name: str, max_items: int = 20000, disk_dir: Optional[str] = None):
+        self.model_name = model_name
+        self.max_items = max_items
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = DiskVectorStore(disk_dir, model_name) if disk_dir else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text: str) -> str:
+        raw = f"{self.model_name}\x00{normalize_key_text(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vec: np.ndarray):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, sentences: List[str]) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """
+        Returns (vectors, miss_positions); vectors[i] is None for every miss.
+        """
+        keys = [self.key(s) for s in sentences]
+        found: List[Optional[np.ndarray]] = [None] * len(sentences)
+        misses: List[int] = []
+        with self._lock:
+            for i, k in enumerate(keys):
+                vec = self._lru.get(k)
+                if vec is not None:
+                    self._lru.move_to_end(k)
+                    self.hits += 1
+                    found[i] = vec
+                else:
+                    misses.append(i)
+
+        if self.disk is not None and misses:
+            # One disk lookup for the whole batch, outside the memory-tier lock
+            disk_vecs = self.disk.get_many([keys[i] for i in misses])
+            with self._lock:
+                still_missing = []
+                for i, vec in zip(misses, disk_vecs):
+                    if vec is None:
+                        still_missing.append(i)
+                    else:
+                        self.disk_hits += 1
+                        self._remember(keys[i], vec)
+                        found[i] = vec
+            misses = still_missing
+
+        with self._lock:
+            self.misses += len(misses)
+        return found, misses
+
+    def store(self, sentences: List[str], vecs: np.ndarray):
+        keys = [self.key(s) for s in sentences]
+        with self._lock:
+            for k, v in zip(keys, vecs):
+                # Copy: a row view would keep the whole batch array alive
+                self._remember(k, np.array(v))
+        if self.disk is not None:
+            self.disk.put_many(keys, vecs)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "size": len(self._lru),
+            "max_items": self.max_items,
+            "disk_size": len(self.disk) if self.disk is not None else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,169 @@
+# app/utils/langid.py
+"""
+Fast language identification for the languages the analyzer localizes to.
+
+Two steps instead of one general-purpose detector:
+  1. Unicode script: Devanagari text can only be hi/mr, Latin text en/es.
+  2. A compact character 1-3 gram model decides within that pair
+     (naive Bayes over log-probabilities, unseen grams get a floor).
+
+The model lives in langid_profiles.json, precompiled from langdetect's
+Wikipedia profiles so no training data is needed at runtime:
+
+    python -m app.utils.langid --build
+
+Text in any other script returns None; the caller falls back to langdetect.
+"""
+
+import argparse
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), "langid_profiles.json")
+SCRIPT_LANGS = {"devanagari": ("hi", "mr"), "latin": ("en", "es")}
+MAX_GRAM = 3
+
+_PROFILES: Optional[Dict] = None
+
+
+def _is_devanagari(c: str) -> bool:
+    return "ऀ" <= c <= "ॿ"
+
+
+def _is_latin(c: str) -> bool:
+    # Basic Latin + Latin-1 + Latin Extended-A/B letters
+    return c < "ɐ" and c.isalpha()
+
+
+def script_of(text: str) -> Optional[str]:
+    """
+    "devanagari" or "latin" when that script holds most of the letters, else None.
+    """
+    dev = lat = other = 0
+    for c in text:
+        if _is_devanagari(c):
+            dev += 1
+        elif _is_latin(c):
+            lat += 1
+        elif c.isalpha():
+            other += 1
+    if dev > lat and dev >= other:
+        return "devanagari"
+    if lat >= dev and lat > other:
+        return "latin"
+    return None
+
+
+def _load_profiles() -> Dict:
+    global _PROFILES
+    if _PROFILES is None:
+        with open(PROFILE_PATH, "r", encoding="utf-8") as f:
+            _PROFILES = json.load(f)
+    return _PROFILES
+
+
+@lru_cache(maxsize=None)
+def _pair_model(a: str, b: str) -> Tuple[Dict[str, float], Tuple[float, ...]]:
+    """
+    Log-likelihood ratio log P(g|a) - log P(g|b) for every gram either profile
+    knows, plus the ratio for grams neither knows (per n). One lookup per gram.
+    """
+    pa, pb = _load_profiles()[a], _load_profiles()[b]
+    fa, fb = pa["floor"], pb["floor"]
+    ratio = {}
+    for g in set(pa["grams"]) | set(pb["grams"]):
+        n = len(g) - 1
+        ratio[g] = pa["grams"].get(g, fa[n]) - pb["grams"].get(g, fb[n])
+    return ratio, tuple(x - y for x, y in zip(fa, fb))
+
+
+def _words(text: str, script: str):
+    keep = _is_devanagari if script == "devanagari" else _is_latin
+    for w in text.lower().split():
+        w = "".join(c for c in w if keep(c))
+        if w:
+            yield " " + w + " "
+
+
+def pair_score(text: str, langs: Tuple[str, str], script: str) -> float:
+    """
+    Log-likelihood ratio of text under langs[0] vs langs[1] (> 0 favours langs[0]).
+    """
+    ratio, unseen = _pair_model(*langs)
+    get = ratio.get
+    score = 0.0
+    for w in _words(text, script):
+        for n in range(1, MAX_GRAM + 1):
+            miss = unseen[n - 1]
+            for i in range(len(w) - n + 1):
+                score += get(w[i:i + n], miss)
+        score -= get(" ", unseen[0]) * 2  # the padding spaces are not letters
+    return score
+
+
+def detect_fast(text: str) -> Optional[str]:
+    """
+    One of en/es/hi/mr, or None when the text is not mostly Latin or Devanagari.
+    """
+    script = script_of(text)
+    if script is None:
+        return None
+    a, b = SCRIPT_LANGS[script]
+    return a if pair_score(text, (a, b), script) >= 0 else b
+
+
+# ------------------ Model building ------------------ #
+
+def build_profiles(top_k: int = 800, unigrams: int = 120) -> Dict:
+    """
+    Compact profiles from langdetect's n-gram counts: the `top_k` most frequent
+    2- and 3-grams and `unigrams` 1-grams per language, as log-probabilities,
+    plus a per-n floor for grams that were cut.
+    """
+    import langdetect
+
+    src = os.path.join(os.path.dirname(langdetect.__file__), "profiles")
+    out = {}
+    for langs in SCRIPT_LANGS.values():
+        for lang in langs:
+            with open(os.path.join(src, lang), "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            totals = raw["n_words"]
+            # Text is lowercased before gram extraction (_words), so cased
+            # grams (" A", "El ") could never match: merge them into lowercase
+            freq: Dict[str, int] = {}
+            for g, c in raw["freq"].items():
+                freq[g.lower()] = freq.get(g.lower(), 0) + c
+            grams: Dict[str, float] = {}
+            floor = []
+            for n in range(1, MAX_GRAM + 1):
+                counts = sorted(
+                    ((g, c) for g, c in freq.items() if len(g) == n),
+                    key=lambda gc: (-gc[1], gc[0]),
+                )
+                kept = counts[: (unigrams if n == 1 else top_k)]
+                for g, c in kept:
+                    grams[g] = round(math.log(c / totals[n - 1]), 3)
+                # Anything not kept is rarer than the last kept gram
+                floor.append(round(math.log(kept[-1][1] / totals[n - 1]) - 1.0, 3))
+            out[lang] = {"grams": grams, "floor": floor}
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.utils.langid", description="Rebuild the language-ID profiles.")
+    parser.add_argument("--build", action="store_true", help=f"write {PROFILE_PATH}")
+    parser.add_argument("--top-k", type=int, default=800, help="2- and 3-grams kept per language")
+    args = parser.parse_args(argv)
+    if args.build:
+        profiles = build_profiles(args.top_k)
+        with open(PROFILE_PATH, "w", encoding="utf-8") as f:
+            json.dump(profiles, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        print(f"Wrote {PROFILE_PATH} ({os.path.getsize(PROFILE_PATH) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
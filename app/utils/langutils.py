@@ -1,60 +1,140 @@
 # app/utils/langutils.py
 
+import os
+import threading
+from functools import lru_cache
+from typing import List
+
 from langdetect import detect, DetectorFactory
 
+from app.utils.langid import detect_fast
+
 DetectorFactory.seed = 0
 
-# We'll load translation pipelines lazily the first time each language is requested.
-EN_TO_MR = None
-EN_TO_HI = None
-EN_TO_ES = None
+# Language ID: "fast" = script check + compact n-gram model (app/utils/langid.py),
+# falling back to langdetect for other scripts; "langdetect" = langdetect only.
+LANGID_BACKEND = os.getenv("TOTEM_LANGID", "fast")
+LANGID_SAMPLE_CHARS = int(os.getenv("TOTEM_LANGID_SAMPLE_CHARS", "400"))   # detect on this prefix only
+LANGID_CACHE_SIZE = int(os.getenv("TOTEM_LANGID_CACHE_SIZE", "4096"))       # memoized samples (0 = off)
+
+
+def _langdetect(text: str) -> str:
+    try:
+        return detect(text)
+    except Exception:
+        return "en"
+
+
+def _detect_sample(sample: str) -> str:
+    if LANGID_BACKEND == "langdetect":
+        return _langdetect(sample)
+    return detect_fast(sample) or _langdetect(sample)
+
+
+_detect_sample_cached = lru_cache(maxsize=LANGID_CACHE_SIZE)(_detect_sample) if LANGID_CACHE_SIZE > 0 else None
+
+
+def language_sample(text: str) -> str:
+    """
+    Bounded prefix used for detection, cut at a word boundary.
+    """
+    text = text.strip()
+    if len(text) <= LANGID_SAMPLE_CHARS:
+        return text
+    sample = text[:LANGID_SAMPLE_CHARS]
+    cut = sample.rfind(" ")
+    return sample[:cut] if cut > LANGID_SAMPLE_CHARS // 2 else sample
+
 
 def detect_language(text: str) -> str:
     """
-    Detect language code using langdetect.
+    Detect language code of text (from a bounded prefix, memoized).
     Returns short code like 'en', 'mr', 'hi', 'es', etc.
     """
-    try:
-        lang = detect(text)
-        return lang
-    except Exception:
+    sample = language_sample(text or "")
+    if not sample:
         return "en"
+    if _detect_sample_cached is not None:
+        return _detect_sample_cached(sample)
+    return _detect_sample(sample)
+
+
+def langid_cache_stats():
+    if _detect_sample_cached is None:
+        return None
+    info = _detect_sample_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+# ------------------ Translation pipelines ------------------ #
+
+# en -> xx opus-mt models. With TOTEM_TRANSLATION_MODEL_DIR set they are loaded
+# from <dir>/opus-mt-en-xx only (no network), e.g. a copy made with
+# `huggingface-cli download Helsinki-NLP/opus-mt-en-hi --local-dir <dir>/opus-mt-en-hi`.
+TRANSLATION_MODELS = {
+    "mr": "Helsinki-NLP/opus-mt-en-mr",
+    "hi": "Helsinki-NLP/opus-mt-en-hi",
+    "es": "Helsinki-NLP/opus-mt-en-es",
+}
+TRANSLATION_MODEL_DIR = os.getenv("TOTEM_TRANSLATION_MODEL_DIR") or None
+
+# Pipelines are loaded lazily the first time each language is requested.
+_TRANSLATORS = {}
+_TRANSLATORS_LOCK = threading.Lock()
 
 
-def _get_en_to_mr():
-    global EN_TO_MR
-    if EN_TO_MR is None:
-        from transformers import pipeline
-        EN_TO_MR = pipeline("translation", model="Helsinki-NLP/opus-mt-en-mr")
-    return EN_TO_MR
+def translation_model_path(target_lang: str) -> str:
+    name = TRANSLATION_MODELS[target_lang]
+    if TRANSLATION_MODEL_DIR:
+        return os.path.join(TRANSLATION_MODEL_DIR, name.split("/")[-1])
+    return name
 
 
-def _get_en_to_hi():
-    global EN_TO_HI
-    if EN_TO_HI is None:
-        from transformers import pipeline
-        EN_TO_HI = pipeline("translation", model="Helsinki-NLP/opus-mt-en-hi")
-    return EN_TO_HI
+def get_translator(target_lang: str):
+    """
+    The en->target_lang pipeline, loaded on first use.
+    """
+    pipe = _TRANSLATORS.get(target_lang)
+    if pipe is None:
+        with _TRANSLATORS_LOCK:
+            pipe = _TRANSLATORS.get(target_lang)
+            if pipe is None:
+                from transformers import pipeline
+                kwargs = {"model_kwargs": {"local_files_only": True}} if TRANSLATION_MODEL_DIR else {}
+                pipe = pipeline("translation", model=translation_model_path(target_lang), **kwargs)
+                _TRANSLATORS[target_lang] = pipe
+    return pipe
+
+
+def preload_translator(target_lang: str):
+    """
+    Load the en->target_lang pipeline now instead of on the first request.
+    """
+    if target_lang in TRANSLATION_MODELS:
+        get_translator(target_lang)
 
 
-def _get_en_to_es():
-    global EN_TO_ES
-    if EN_TO_ES is None:
-        from transformers import pipeline
-        EN_TO_ES = pipeline("translation", model="Helsinki-NLP/opus-mt-en-es")
-    return EN_TO_ES
+def translate_batch(texts: List[str], target_lang: str, batch_size: int = 16) -> List[str]:
+    """
+    Translate English texts to target_lang in one pipeline call (raises on failure).
+    """
+    out = get_translator(target_lang)(texts, max_length=512, batch_size=batch_size)
+    return [o["translation_text"] for o in out]
 
 
-def _safe_translate(pipeline_getter, text: str) -> str:
+def _safe_translate(target_lang: str, text: str) -> str:
     """
-    Helper: run HF pipeline safely.
-    pipeline_getter is a function that returns a pipeline (and loads it lazily).
+    Helper: run the HF pipeline safely.
     If anything fails, return original text.
     """
     try:
-        pipe = pipeline_getter()
-        out = pipe(text, max_length=512)
-        return out[0]["translation_text"]
+        return translate_batch([text], target_lang)[0]
     except Exception:
         return text
 
@@ -79,14 +159,8 @@ def translate_text_if_needed(text: str, target_lang: str = "auto") -> str:
     if target_lang in ("auto", "en", None, ""):
         return text
 
-    if target_lang == "mr":
-        return _safe_translate(_get_en_to_mr, text)
-
-    if target_lang == "hi":
-        return _safe_translate(_get_en_to_hi, text)
-
-    if target_lang == "es":
-        return _safe_translate(_get_en_to_es, text)
+    if target_lang in TRANSLATION_MODELS:
+        return _safe_translate(target_lang, text)
 
     # For any other languages, just return the original English
     return text
@@ -0,0 +1,122 @@
+# app/utils/ndjson.py
+"""
+NDJSON in, NDJSON out over a single HTTP exchange.
+
+The request body is split into lines as it arrives and the response streams
+records while the body is still being read, so neither side ever holds the
+whole batch.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Dict, Mapping, Optional
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Lines of a chunked byte stream, without the newline; blank lines are
+    skipped. A line longer than max_line_bytes is dropped while it streams in
+    and reported as None, so one bad record cannot grow the buffer.
+    """
+    buf = bytearray()
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            if nl < 0:
+                if not skipping:
+                    buf += chunk[start:]
+                    if len(buf) > max_line_bytes:
+                        buf.clear()
+                        skipping = True
+                break
+            if skipping:
+                skipping = False
+                yield None
+            else:
+                buf += chunk[start:nl]
+                if len(buf) > max_line_bytes:
+                    yield None
+                elif buf.strip():
+                    yield bytes(buf)
+                buf.clear()
+            start = nl + 1
+    if skipping or len(buf) > max_line_bytes:
+        yield None
+    elif buf.strip():
+        yield bytes(buf)
+
+
+class NDJSONDuplexResponse(StreamingResponse):
+    """
+    Streams produce(lines) as NDJSON while the request body is still arriving.
+
+    StreamingResponse watches for disconnects by calling receive() itself,
+    which would swallow request-body chunks. Here one reader task owns
+    receive(): body chunks go through a small queue (a consumer that falls
+    behind stops reading, which pushes back on the client) and a disconnect
+    cancels the producer.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        produce: Callable[[AsyncIterator[Optional[bytes]]], AsyncIterator[Dict]],
+        max_line_bytes: int = 1 << 20,
+        headers: Optional[Mapping[str, str]] = None,
+        queued_chunks: int = 4,
+    ):
+        self.produce = produce
+        self.max_line_bytes = max_line_bytes
+        self.queued_chunks = max(1, queued_chunks)
+        self.status_code = 200
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        chunks: asyncio.Queue = asyncio.Queue(self.queued_chunks)
+
+        async def read_body():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                if message.get("body"):
+                    await chunks.put(message["body"])
+                if not message.get("more_body", False):
+                    break
+            await chunks.put(None)
+            # Body complete: keep listening so a disconnect is still noticed
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        async def body_chunks():
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    return
+                yield chunk
+
+        async def records():
+            async for record in self.produce(iter_lines(body_chunks(), self.max_line_bytes)):
+                yield json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+        self.body_iterator = records()
+        reader = asyncio.ensure_future(read_body())
+        writer = asyncio.ensure_future(self.stream_response(send))
+        try:
+            done, _ = await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+            if writer in done:
+                writer.result()  # re-raise producer errors
+            else:
+                # The reader only stops first on disconnect: drop all pending work
+                writer.cancel()
+                await asyncio.wait({writer})
+        finally:
+            reader.cancel()
+            writer.cancel()
@@ -0,0 +1,224 @@
+# app/utils/resultcache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def normalize_input(text: str) -> str:
+    """
+    Normalization for cache keys: NFC and surrounding whitespace only, since
+    the analysis output echoes the (stripped) text back. Not for text whose
+    offsets are part of the result (prompt topic_span).
+    """
+    return unicodedata.normalize("NFC", text or "").strip()
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Stable hash of JSON-serializable parts.
+    """
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCacheBackend:
+    """
+    Storage interface for whole-response results. A shared backend (Redis,
+    memcached, ...) only needs get/set/stats; values are JSON-serializable dicts.
+    Backends whose get/set do IO set `blocking` so callers run them off the
+    event loop.
+    """
+
+    blocking = False
+
+    def get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict):
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {}
+
+
+class MemoryResultBackend(ResultCacheBackend):
+    """
+    In-process LRU with a TTL.
+    """
+
+    def __init__(self, max_items: int = 2048, ttl_s: float = 600.0):
+        self.max_items = max(1, max_items)
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._expired = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            stored, value = item
+            if time.monotonic() - stored > self.ttl_s:
+                del self._items[key]
+                self._expired += 1
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"size": len(self._items), "evictions": self._evictions, "expired": self._expired}
+
+
+class FileResultBackend(ResultCacheBackend):
+    """
+    One JSON file per result under `directory`, shared by every worker on the
+    host. Age comes from the file mtime; the oldest files are pruned once the
+    directory holds more than max_items.
+    """
+
+    PRUNE_EVERY = 64  # sets between size checks
+    blocking = True
+
+    def __init__(self, directory: str, max_items: int = 2048, ttl_s: float = 600.0):
+        self.directory = directory
+        self.max_items = max(1, max_items)
+        self.ttl_s = ttl_s
+        self._sets = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_s:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with self._lock:
+            self._sets += 1
+            prune = self._sets % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def _files(self):
+        for sub in os.scandir(self.directory):
+            if sub.is_dir():
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(".json"):
+                        yield entry
+
+    def prune(self):
+        """
+        Drop expired files, then the oldest ones beyond max_items.
+        """
+        now = time.time()
+        live = []
+        for entry in self._files():
+            try:
+                mtime = entry.stat().st_mtime
+                if now - mtime > self.ttl_s:
+                    os.remove(entry.path)
+                else:
+                    live.append((mtime, entry.path))
+            except OSError:
+                pass  # removed by another worker
+        live.sort()
+        for _, path in live[: max(0, len(live) - self.max_items)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        return {"directory": self.directory}
+
+
+def make_backend(kind: str, max_items: int, ttl_s: float, directory: Optional[str] = None) -> Optional[ResultCacheBackend]:
+    """
+    "memory", "file" (needs directory) or "off" (None).
+    """
+    if kind == "memory":
+        return MemoryResultBackend(max_items, ttl_s)
+    if kind == "file":
+        if not directory:
+            raise ValueError("file result cache needs a directory")
+        return FileResultBackend(directory, max_items, ttl_s)
+    if kind in ("off", "0", ""):
+        return None
+    raise ValueError(f"Unknown result cache backend {kind!r}")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls with the same key: the first caller runs
+    the work, later callers await its outcome instead of repeating it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        """
+        Returns (result, shared); shared is True when another call produced it.
+        """
+        fut = self._calls.get(key)
+        if fut is not None:
+            try:
+                return await asyncio.shield(fut), True
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise  # this caller was cancelled
+                # The first caller went away (e.g. a stream client disconnected): run it here
+                return await self.do(key, fn)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._calls[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
@@ -1,18 +1,77 @@
 # app/utils/textutils.py
+"""
+Sentence segmentation in one pass over the text.
+
+A single precompiled pattern matches each sentence body directly (already
+stripped of surrounding whitespace), so segmentation yields (start, end)
+offsets into the original string; cleanup and the minimum-length check happen
+on the same match instead of in separate passes.
+"""
 
 import re
+from typing import Iterable, Iterator, List, Pattern, Tuple
+
+# ASCII . ! ?, Devanagari danda and double danda (hi/mr), full-width/CJK marks
+SENT_TERMINATORS = ".!?।॥。！？"
+_T = re.escape(SENT_TERMINATORS)
+
+# One match = one sentence: non-space start, runs up to the next terminator,
+# trailing whitespace excluded
+_SENT_BODY = re.compile(rf"[^\s{_T}](?:[^{_T}]*[^\s{_T}])?")
+# A terminator and the whitespace after it
+_SENT_END = re.compile(rf"[{_T}]\s*")
+_WS = re.compile(r"\s+")
+
+Span = Tuple[int, int]
+
+
+def iter_segments(text: str, min_len: int = 0) -> Iterator[Tuple[int, int, str]]:
+    """
+    (start, end, cleaned) per sentence: text[start:end] is the stripped sentence
+    as written, cleaned has its inner whitespace collapsed. Sentences shorter
+    than min_len after cleanup are skipped (before cleanup when the raw span is
+    already too short).
+    """
+    if not text:
+        return
+    for m in _SENT_BODY.finditer(text):
+        start, end = m.span()
+        if end - start < min_len:
+            continue
+        body = m.group()
+        cleaned = " ".join(body.split())
+        if len(cleaned) >= min_len:
+            yield start, end, cleaned
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """
+    Lazy version of split_sentences: yields one stripped sentence at a time,
+    so very long texts never need a full list of parts.
+    """
+    if not text:
+        return
+    for m in _SENT_BODY.finditer(text):
+        yield m.group()
+
+
+def last_sentence_end(text: str, start: int = 0) -> int:
+    """
+    Position just after the last sentence terminator in text[start:], or -1.
+    Everything before it splits the same way no matter what text follows.
+    """
+    end = -1
+    for m in _SENT_END.finditer(text, start):
+        end = m.start() + 1
+    return end
 
-def split_sentences(text: str):
+
+def split_sentences(text: str) -> List[str]:
     """
     Very simple sentence splitter based on punctuation.
     This avoids NLTK data downloads and is enough for our prototype.
     """
-    if not text:
-        return []
-    # Split on ., ?, ! followed by whitespace (or end of text)
-    parts = re.split(r"[.!?]\s*", text)
-    # Clean and drop empty strings
-    return [p.strip() for p in parts if p.strip()]
+    return list(iter_sentences(text))
 
 def clean_text(s: str) -> str:
     """
@@ -21,5 +80,17 @@ def clean_text(s: str) -> str:
     if not isinstance(s, str):
         s = str(s)
     s = s.strip()
-    s = re.sub(r"\s+", " ", s)
+    s = _WS.sub(" ", s)
     return s
+
+
+def compile_fragments(fragments: Iterable[str]) -> Pattern:
+    """
+    One case-insensitive pattern matching any of the fragments as a substring,
+    so a sentence is checked in a single scan instead of once per fragment.
+    Longer fragments come first in the alternation.
+    """
+    unique = sorted({f.lower() for f in fragments if f}, key=lambda f: (-len(f), f))
+    if not unique:
+        return re.compile(r"(?!)")  # matches nothing
+    return re.compile("|".join(re.escape(f) for f in unique), re.IGNORECASE)
@@ -0,0 +1,124 @@
+# app/utils/transcache.py
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.embcache import normalize_key_text
+
+
+class DiskTranslationStore:
+    """
+    Persistent tier: one SQLite table of (model, lang, source) -> translation.
+    Safe to share between worker processes (WAL mode, one connection per process).
+    """
+
+    def __init__(self, directory: str, model_tag: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "translations.sqlite")
+        self.model_tag = model_tag
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Connections must not cross a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "model TEXT, lang TEXT, source TEXT, target TEXT, PRIMARY KEY (model, lang, source))"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, lang: str, keys: List[str]) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        with self._lock:
+            db = self._db()
+            for i in range(0, len(keys), 500):  # stay under SQLite's parameter limit
+                chunk = keys[i:i + 500]
+                rows = db.execute(
+                    f"SELECT source, target FROM translations WHERE model = ? AND lang = ? "
+                    f"AND source IN ({','.join('?' * len(chunk))})",
+                    [self.model_tag, lang, *chunk],
+                )
+                out.update(rows)
+        return out
+
+    def put_many(self, lang: str, pairs: List[Tuple[str, str]]):
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                [(self.model_tag, lang, k, v) for k, v in pairs],
+            )
+            db.commit()
+
+
+class TranslationCache:
+    """
+    Two-tier cache of machine translations keyed on (target language, source text):
+    an in-memory LRU in front of an optional SQLite store that survives restarts.
+    """
+
+    def __init__(self, model_tag: str, max_items: int = 20000, disk_dir: Optional[str] = None):
+        self.max_items = max_items
+        self.disk = DiskTranslationStore(disk_dir, model_tag) if disk_dir else None
+        self._lru: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _remember(self, key: Tuple[str, str], value: str):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def lookup(self, lang: str, texts: List[str]) -> List[Optional[str]]:
+        """
+        Cached translation per text, None where there is none yet.
+        """
+        keys = [normalize_key_text(t) for t in texts]
+        found: List[Optional[str]] = [None] * len(texts)
+        with self._lock:
+            for i, k in enumerate(keys):
+                v = self._lru.get((lang, k))
+                if v is not None:
+                    self._lru.move_to_end((lang, k))
+                    found[i] = v
+                    self._stats["hits"] += 1
+
+        pending = [i for i, v in enumerate(found) if v is None]
+        if pending and self.disk is not None:
+            on_disk = self.disk.get_many(lang, list({keys[i] for i in pending}))
+            with self._lock:
+                for i in pending:
+                    v = on_disk.get(keys[i])
+                    if v is not None:
+                        found[i] = v
+                        self._remember((lang, keys[i]), v)
+                        self._stats["disk_hits"] += 1
+
+        with self._lock:
+            self._stats["misses"] += sum(1 for v in found if v is None)
+        return found
+
+    def store(self, lang: str, texts: List[str], translations: List[str]):
+        pairs = [(normalize_key_text(t), v) for t, v in zip(texts, translations)]
+        with self._lock:
+            for k, v in pairs:
+                self._remember((lang, k), v)
+        if self.disk is not None:
+            self.disk.put_many(lang, pairs)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            s = dict(self._stats, size=len(self._lru))
+        lookups = s["hits"] + s["disk_hits"] + s["misses"]
+        s["hit_rate"] = round((s["hits"] + s["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return s
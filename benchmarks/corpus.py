@@ -0,0 +1,99 @@
+# benchmarks/corpus.py
+"""
+Synthetic multilingual prompt/response pairs (en, hi, mr, es) of controlled size.
+
+Everything is generated from fixed word lists with a seeded RNG, so the same
+(lang, size, seed) always produces the same text and runs need no downloads.
+"""
+
+import random
+from typing import Dict, List
+
+LANGS = ("en", "hi", "mr", "es")
+
+TOPICS = {
+    "en": ["machine learning", "photosynthesis", "inflation", "the water cycle", "neural networks",
+           "climate change", "blockchain", "vaccines", "gravity", "compound interest",
+           "supply chains", "renewable energy", "the immune system", "cloud computing", "democracy"],
+    "hi": ["मशीन लर्निंग", "प्रकाश संश्लेषण", "महंगाई", "जल चक्र", "न्यूरल नेटवर्क",
+           "जलवायु परिवर्तन", "ब्लॉकचेन", "टीके", "गुरुत्वाकर्षण", "चक्रवृद्धि ब्याज",
+           "आपूर्ति श्रृंखला", "नवीकरणीय ऊर्जा", "प्रतिरक्षा प्रणाली", "क्लाउड कंप्यूटिंग", "लोकतंत्र"],
+    "mr": ["मशीन लर्निंग", "प्रकाशसंश्लेषण", "महागाई", "जलचक्र", "न्यूरल नेटवर्क",
+           "हवामान बदल", "ब्लॉकचेन", "लसी", "गुरुत्वाकर्षण", "चक्रवाढ व्याज",
+           "पुरवठा साखळी", "अक्षय ऊर्जा", "रोगप्रतिकारक शक्ती", "क्लाउड संगणन", "लोकशाही"],
+    "es": ["el aprendizaje automático", "la fotosíntesis", "la inflación", "el ciclo del agua",
+           "las redes neuronales", "el cambio climático", "la cadena de bloques", "las vacunas",
+           "la gravedad", "el interés compuesto", "las cadenas de suministro", "la energía renovable",
+           "el sistema inmunológico", "la computación en la nube", "la democracia"],
+}
+
+QUESTIONS = {
+    "en": ["What is {t}?", "How does {t} work in practice?", "Why is {t} important today?",
+           "What are the main types of {t}?", "Explain the limitations of {t}."],
+    "hi": ["{t} क्या है?", "{t} व्यवहार में कैसे काम करता है?", "आज {t} क्यों महत्वपूर्ण है?",
+           "{t} के मुख्य प्रकार क्या हैं?", "{t} की सीमाएँ समझाइए।"],
+    "mr": ["{t} म्हणजे काय?", "{t} प्रत्यक्षात कसे काम करते?", "आज {t} का महत्त्वाचे आहे?",
+           "{t} चे मुख्य प्रकार कोणते आहेत?", "{t} च्या मर्यादा स्पष्ट करा।"],
+    "es": ["¿Qué es {t}?", "¿Cómo funciona {t} en la práctica?", "¿Por qué es importante {t} hoy?",
+           "¿Cuáles son los tipos principales de {t}?", "Explica las limitaciones de {t}."],
+}
+
+ANSWERS = {
+    "en": ["{t} is a concept that describes how systems change over time.",
+           "In practice {t} depends on careful measurement and clear rules.",
+           "Many experts consider {t} important because it affects daily life.",
+           "There are several types of {t}, each with different trade-offs.",
+           "A common limitation of {t} is that it needs good data to work well."],
+    "hi": ["{t} एक अवधारणा है जो बताती है कि प्रणालियाँ समय के साथ कैसे बदलती हैं।",
+           "व्यवहार में {t} सावधानीपूर्वक माप और स्पष्ट नियमों पर निर्भर करता है।",
+           "कई विशेषज्ञ {t} को महत्वपूर्ण मानते हैं क्योंकि यह रोज़मर्रा के जीवन को प्रभावित करता है।",
+           "{t} के कई प्रकार हैं और हर प्रकार के अलग फायदे और नुकसान हैं।",
+           "{t} की एक आम सीमा यह है कि इसे अच्छे डेटा की ज़रूरत होती है।"],
+    "mr": ["{t} ही एक संकल्पना आहे जी प्रणाली कालांतराने कशा बदलतात ते सांगते।",
+           "प्रत्यक्षात {t} काळजीपूर्वक मोजमाप आणि स्पष्ट नियमांवर अवलंबून असते।",
+           "अनेक तज्ञ {t} महत्त्वाचे मानतात कारण त्याचा दैनंदिन जीवनावर परिणाम होतो।",
+           "{t} चे अनेक प्रकार आहेत आणि प्रत्येकाचे फायदे व तोटे वेगळे आहेत।",
+           "{t} ची एक सामान्य मर्यादा म्हणजे त्याला चांगल्या डेटाची गरज असते।"],
+    "es": ["{t} es un concepto que describe cómo cambian los sistemas con el tiempo.",
+           "En la práctica {t} depende de mediciones cuidadosas y reglas claras.",
+           "Muchos expertos consideran importante {t} porque afecta la vida diaria.",
+           "Existen varios tipos de {t}, cada uno con ventajas y desventajas.",
+           "Una limitación común de {t} es que necesita buenos datos para funcionar."],
+}
+
+
+def make_text(lang: str, n_sentences: int, templates: Dict[str, List[str]], rng: random.Random) -> str:
+    topics = TOPICS[lang]
+    forms = templates[lang]
+    sentences = []
+    for _ in range(n_sentences):
+        s = rng.choice(forms).format(t=rng.choice(topics))
+        sentences.append(s[0].upper() + s[1:])
+    return " ".join(sentences)
+
+
+def make_pair(lang: str, size: int, seed: int = 0) -> Dict:
+    """
+    One record in the /analyze request shape.
+    The response has `size` sentences, the prompt a quarter of that (at least 1).
+    """
+    rng = random.Random(f"{lang}:{size}:{seed}")
+    return {
+        "user_prompt": make_text(lang, max(1, size // 4), QUESTIONS, rng),
+        "ai_response": make_text(lang, size, ANSWERS, rng),
+        "output_language": lang,
+    }
+
+
+def make_corpus(langs=LANGS, sizes=(1, 5, 10, 50, 100, 500), per_case: int = 4, seed: int = 0) -> List[Dict]:
+    """
+    `per_case` distinct pairs for every (lang, size), tagged with lang + size.
+    """
+    corpus = []
+    for lang in langs:
+        for size in sizes:
+            for i in range(per_case):
+                rec = make_pair(lang, size, seed * 1000 + i)
+                rec.update({"lang": lang, "size": size})
+                corpus.append(rec)
+    return corpus
@@ -0,0 +1,104 @@
+# benchmarks/langid_compare.py
+"""
+Accuracy and speed of the fast language ID against langdetect.
+
+    python -m benchmarks.langid_compare
+    python -m benchmarks.langid_compare --fixtures benchmarks/langid_fixtures.jsonl --json langid.json
+
+Two corpora: the hand-written prompts in langid_fixtures.jsonl (short and
+medium, en/hi/mr/es) and synthetic prompt/response pairs from
+benchmarks.corpus. Both detectors see the same bounded prefix sample the
+API uses; the memo is bypassed so every call does real work.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.utils.langutils import _detect_sample, _langdetect, language_sample
+from benchmarks.corpus import LANGS, make_pair
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "langid_fixtures.jsonl")
+
+
+def load_fixtures(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic(sizes=(1, 4, 10, 50), seeds: int = 10) -> List[Dict]:
+    out = []
+    for lang in LANGS:
+        for size in sizes:
+            for seed in range(seeds):
+                pair = make_pair(lang, size, seed)
+                out.append({"lang": lang, "text": pair["user_prompt"]})
+                out.append({"lang": lang, "text": pair["ai_response"]})
+    return out
+
+
+def evaluate(detect: Callable[[str], str], records: List[Dict], repeat: int) -> Dict:
+    samples = [language_sample(r["text"]) for r in records]
+    detect(samples[0])  # load profiles outside the timed loop
+    lat = []
+    for _ in range(repeat):
+        for s in samples:
+            t0 = time.perf_counter()
+            detect(s)
+            lat.append(time.perf_counter() - t0)
+    preds = [detect(s) for s in samples]
+
+    per_lang = {}
+    for lang in sorted({r["lang"] for r in records}):
+        idx = [i for i, r in enumerate(records) if r["lang"] == lang]
+        per_lang[lang] = round(sum(preds[i] == lang for i in idx) / len(idx), 4)
+    lat_us = np.array(lat) * 1e6
+    return {
+        "accuracy": round(sum(p == r["lang"] for p, r in zip(preds, records)) / len(records), 4),
+        "accuracy_per_lang": per_lang,
+        "mean_us": round(float(lat_us.mean()), 1),
+        "p50_us": round(float(np.percentile(lat_us, 50)), 1),
+        "p99_us": round(float(np.percentile(lat_us, 99)), 1),
+        "errors": [
+            {"lang": r["lang"], "predicted": p, "text": r["text"][:80]}
+            for p, r in zip(preds, records) if p != r["lang"]
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.langid_compare", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes over each corpus")
+    parser.add_argument("--json", dest="json_out", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    corpora = {"fixtures": load_fixtures(args.fixtures), "synthetic": synthetic()}
+    detectors = {"fast": _detect_sample, "langdetect": _langdetect}
+
+    report: Dict[str, Dict] = {}
+    print(f"{'corpus':<11}{'detector':<12}{'n':>5}{'accuracy':>10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}  per language")
+    for cname, records in corpora.items():
+        report[cname] = {}
+        for dname, fn in detectors.items():
+            r = evaluate(fn, records, args.repeat)
+            report[cname][dname] = r
+            langs = " ".join(f"{k}={v:.2f}" for k, v in r["accuracy_per_lang"].items())
+            print(f"{cname:<11}{dname:<12}{len(records):>5}{r['accuracy']:>10.3f}"
+                  f"{r['mean_us']:>10.1f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}  {langs}")
+        fast, ref = report[cname]["fast"], report[cname]["langdetect"]
+        report[cname]["speedup"] = round(ref["mean_us"] / fast["mean_us"], 1) if fast["mean_us"] else None
+        print(f"{cname:<11}{'speedup':<12}{report[cname]['speedup']:>5}x")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# benchmarks/loadtest.py
+"""
+Open-loop HTTP load test of the analyzer API.
+
+    python -m benchmarks.loadtest --url http://localhost:8000 --rates 5 10 20 40 --step-seconds 20
+    python -m benchmarks.loadtest --spawn --rates 50 100 200 --mix short=8 long=2 --langs en hi
+    python -m benchmarks.loadtest --spawn --backend torch --rates 2 4 8 --json load.json
+
+Requests are sent on a fixed schedule (Poisson or evenly spaced arrivals at
+each rate in --rates), whether or not earlier ones have finished, so a slow
+server builds up a backlog instead of silently slowing the client down.
+Payloads are synthetic prompt/response pairs from benchmarks.corpus in the
+chosen languages and size classes.
+
+Each step reports throughput, latency percentiles of successful requests,
+error and timeout rates, and the client's own send lag (if that grows, the
+client could not keep up and the step measured the client, not the server).
+
+--spawn starts a local uvicorn server first, by default with the stand-in
+encoder (TOTEM_ENCODER_BACKEND=fake), so the serving, batching and admission
+layers can be tested on machines without the model. Its simulated cost is set
+with TOTEM_FAKE_ENCODER_BATCH_MS / TOTEM_FAKE_ENCODER_SENTENCE_MS.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.corpus import LANGS, make_pair
+
+# Response sentences per size class (the prompt gets a quarter)
+SIZE_CLASSES = {"short": 4, "medium": 20, "long": 120}
+
+
+def parse_weights(items: List[str], known) -> Dict[str, float]:
+    """
+    ["short=8", "long=2"] -> {"short": 8.0, "long": 2.0}; a bare name weighs 1.
+    """
+    out = {}
+    for item in items:
+        name, _, w = item.partition("=")
+        if name not in known:
+            raise SystemExit(f"Unknown value {name!r}; choose from {', '.join(known)}")
+        out[name] = float(w) if w else 1.0
+    return out
+
+
+class Payloads:
+    """
+    Weighted random payloads. With distinct > 0 each (lang, size) class cycles
+    through that many different texts (repeats can hit the result cache);
+    with 0 every request is new.
+    """
+
+    def __init__(self, langs: Dict[str, float], sizes: Dict[str, float], distinct: int, seed: int):
+        self.classes = [(lang, size) for lang in langs for size in sizes]
+        self.weights = [langs[lang] * sizes[size] for lang, size in self.classes]
+        self.distinct = distinct
+        self.rng = random.Random(seed)
+        self.counter = 0
+
+    def next(self) -> Tuple[str, Dict]:
+        lang, size = self.rng.choices(self.classes, self.weights)[0]
+        self.counter += 1
+        seed = self.rng.randrange(self.distinct) if self.distinct else self.counter
+        return f"{lang}/{size}", make_pair(lang, SIZE_CLASSES[size], seed)
+
+
+def arrival_times(rate: float, seconds: float, poisson: bool, rng: random.Random) -> List[float]:
+    """
+    Send offsets (s from step start) for one step.
+    """
+    if poisson:
+        out, t = [], rng.expovariate(rate)
+        while t < seconds:
+            out.append(t)
+            t += rng.expovariate(rate)
+        return out
+    return [i / rate for i in range(int(rate * seconds))]
+
+
+async def _one(client: httpx.AsyncClient, path: str, payload: Dict, timeout: float) -> Tuple[str, float, Optional[str]]:
+    t0 = time.perf_counter()
+    try:
+        # Total deadline (httpx's own timeout applies per connect/read/write)
+        r = await asyncio.wait_for(client.post(path, json=payload, timeout=None), timeout)
+        outcome = "ok" if r.status_code == 200 else str(r.status_code)
+        return outcome, time.perf_counter() - t0, r.headers.get("x-cache")
+    except asyncio.TimeoutError:
+        return "timeout", time.perf_counter() - t0, None
+    except httpx.HTTPError as e:
+        return type(e).__name__, time.perf_counter() - t0, None
+
+
+def _pct(values: np.ndarray, q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)) * 1000, 1) if len(values) else None
+
+
+async def run_step(client: httpx.AsyncClient, path: str, payloads: Payloads, rate: float, seconds: float,
+                   poisson: bool, timeout: float, rng: random.Random) -> Dict:
+    schedule = arrival_times(rate, seconds, poisson, rng)
+    tasks, lags, classes = [], [], []
+    start = time.perf_counter()
+    for offset in schedule:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lags.append(time.perf_counter() - start - offset)
+        cls, payload = payloads.next()
+        classes.append(cls)
+        tasks.append(asyncio.ensure_future(_one(client, path, payload, timeout)))
+    sent_for = time.perf_counter() - start
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    outcomes = Counter(r[0] for r in results)
+    ok_lat = np.array([lat for outcome, lat, _ in results if outcome == "ok"])
+    n = len(results)
+    per_class = {}
+    for cls in sorted(set(classes)):
+        lat = np.array([r[1] for r, c in zip(results, classes) if c == cls and r[0] == "ok"])
+        per_class[cls] = {"sent": classes.count(cls), "p50_ms": _pct(lat, 50), "p99_ms": _pct(lat, 99)}
+    return {
+        "target_rps": rate,
+        "sent": n,
+        "send_rps": round(n / sent_for, 2) if sent_for else None,
+        "throughput_rps": round(outcomes["ok"] / elapsed, 2) if elapsed else None,
+        "ok": outcomes["ok"],
+        "error_rate": round((n - outcomes["ok"] - outcomes["timeout"]) / n, 4) if n else 0.0,
+        "timeout_rate": round(outcomes["timeout"] / n, 4) if n else 0.0,
+        "outcomes": dict(outcomes),
+        "cache": dict(Counter(r[2] for r in results if r[2])),
+        "p50_ms": _pct(ok_lat, 50),
+        "p90_ms": _pct(ok_lat, 90),
+        "p99_ms": _pct(ok_lat, 99),
+        "max_ms": round(float(ok_lat.max()) * 1000, 1) if len(ok_lat) else None,
+        "send_lag_p99_ms": _pct(np.array(lags), 99),
+        "per_class": per_class,
+    }
+
+
+# ------------------ Local server ------------------ #
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(backend: str, env_overrides: Dict[str, str], ready_timeout: float = 300.0) -> Tuple[subprocess.Popen, str]:
+    """
+    Start `uvicorn app.main:app` on a free local port and wait for /readyz.
+    """
+    port = _free_port()
+    env = dict(os.environ, TOTEM_ENCODER_BACKEND=backend, **env_overrides)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + ready_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited with code {proc.returncode}")
+        try:
+            if httpx.get(url + "/readyz", timeout=1.0).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit(f"Server not ready after {ready_timeout:.0f}s (it must warm up at startup: TOTEM_WARMUP=1)")
+
+
+# ------------------ Driver ------------------ #
+
+async def run_load(url: str, path: str, payloads: Payloads, rates: List[float], seconds: float, poisson: bool,
+                   timeout: float, seed: int, warmup: int) -> List[Dict]:
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+        for _ in range(warmup):
+            await _one(client, path, payloads.next()[1], timeout)
+        steps = []
+        for rate in rates:
+            step = await run_step(client, path, payloads, rate, seconds, poisson, timeout, rng)
+            steps.append(step)
+            print(f"{rate:>8.1f} {step['send_rps']:>9} {step['throughput_rps']:>9} "
+                  f"{str(step['p50_ms']):>9} {str(step['p90_ms']):>9} {str(step['p99_ms']):>9} "
+                  f"{step['error_rate']:>7.2%} {step['timeout_rate']:>7.2%} {str(step['send_lag_p99_ms']):>9}",
+                  flush=True)
+        return steps
+
+
+def saturation(steps: List[Dict], slo_ms: float, max_error_rate: float) -> Optional[float]:
+    """
+    Highest target rate whose p99 met the SLO with few errors/timeouts
+    (None if no step did).
+    """
+    good = [
+        s["target_rps"] for s in steps
+        if s["p99_ms"] is not None and s["p99_ms"] <= slo_ms
+        and s["error_rate"] + s["timeout_rate"] <= max_error_rate
+    ]
+    return max(good) if good else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://localhost:8000", help="running server to test")
+    target.add_argument("--spawn", action="store_true", help="start a local uvicorn server for the run")
+    parser.add_argument("--backend", default="fake", help="encoder backend for --spawn (default: fake)")
+    parser.add_argument("--server-env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="extra environment for --spawn, e.g. TOTEM_ANALYZE_CONCURRENCY=2")
+    parser.add_argument("--path", default="/analyze")
+    parser.add_argument("--rates", nargs="+", type=float, default=[5, 10, 20], help="requests/s, one step each")
+    parser.add_argument("--step-seconds", type=float, default=15.0)
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--langs", nargs="+", default=list(LANGS), metavar="LANG[=WEIGHT]")
+    parser.add_argument("--mix", nargs="+", default=["short=3", "medium=1"], metavar="SIZE[=WEIGHT]",
+                        help=f"size classes: {', '.join(f'{k} ({v} sentences)' for k, v in SIZE_CLASSES.items())}")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="distinct texts per class (0 = every request unique, defeating the result cache)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="client timeout per request (s)")
+    parser.add_argument("--warmup", type=int, default=5, help="sequential requests before the first step")
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p99 target for the saturation estimate")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_out", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    payloads = Payloads(parse_weights(args.langs, LANGS), parse_weights(args.mix, SIZE_CLASSES), args.distinct, args.seed)
+
+    proc = None
+    url = args.url
+    if args.spawn:
+        overrides = dict(kv.split("=", 1) for kv in args.server_env)
+        proc, url = spawn_server(args.backend, overrides)
+        print(f"Started server at {url} (backend {args.backend})", file=sys.stderr)
+    try:
+        print(f"{'target':>8} {'sent/s':>9} {'ok/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+              f"{'errors':>7} {'timeout':>7} {'lag p99':>9}")
+        steps = asyncio.run(run_load(url, args.path, payloads, args.rates, args.step_seconds,
+                                     args.arrivals == "poisson", args.timeout, args.seed, args.warmup))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    sat = saturation(steps, args.slo_ms, args.max_error_rate)
+    print(f"Highest rate meeting p99 <= {args.slo_ms:.0f} ms with <= {args.max_error_rate:.0%} errors: "
+          f"{sat if sat is not None else 'none'} req/s")
+
+    if args.json_out:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "url": url,
+                "spawned_backend": args.backend if args.spawn else None,
+                "path": args.path,
+                "arrivals": args.arrivals,
+                "step_seconds": args.step_seconds,
+                "langs": args.langs,
+                "mix": args.mix,
+                "distinct": args.distinct,
+                "timeout_s": args.timeout,
+            },
+            "steps": steps,
+            "saturation_rps": sat,
+        }
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# benchmarks/run.py
+"""
+Analyzer pipeline benchmarks on synthetic en/hi/mr/es corpora.
+
+    python -m benchmarks.run                                # all suites, default sizes
+    python -m benchmarks.run --suites e2e --sizes 10 100    # a subset
+    python -m benchmarks.run --save-baseline                # store benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --fail-on-regression
+
+Suites:
+    text        sentence segmentation + cleanup on prompt and response
+    langid      detect_language on the prompt
+    embeddings  compute_embeddings on the response sentences
+    gaps        similarity + gap detection on precomputed embeddings
+                (its sentences/s counts prompt x response sentence pairs)
+    e2e         analyze_context_full
+
+Runs offline on CPU (the model must already be in the local Hugging Face cache).
+Embedding and language-ID caches, micro-batching and metrics are off so the
+numbers measure the pipeline itself; override with the usual TOTEM_* variables.
+"""
+
+import os
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+os.environ.setdefault("TOTEM_EMB_CACHE_SIZE", "0")
+os.environ.setdefault("TOTEM_EMB_BATCH_MAX_WAIT_MS", "0")
+os.environ.setdefault("TOTEM_METRICS", "0")
+os.environ.setdefault("TOTEM_LANGID_CACHE_SIZE", "0")
+
+import argparse
+import json
+import platform
+import sys
+import time
+from itertools import cycle
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app import analyzer
+from app.scoring import score_coverage
+from app.utils.langutils import detect_language
+from benchmarks.corpus import LANGS, make_corpus
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+DEFAULT_SIZES = [1, 5, 10, 50, 100, 500]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+def measure(fn: Callable[[], int], min_time: float, min_iters: int, max_iters: int) -> Dict:
+    """
+    Call fn repeatedly (fn returns the number of sentences it processed).
+    """
+    latencies: List[float] = []
+    units = 0
+    started = time.perf_counter()
+    while len(latencies) < max_iters:
+        t0 = time.perf_counter()
+        units += fn()
+        latencies.append(time.perf_counter() - t0)
+        if len(latencies) >= min_iters and time.perf_counter() - started >= min_time:
+            break
+    lat_ms = np.array(latencies) * 1000.0
+    total = float(np.sum(latencies))
+    return {
+        "iterations": len(latencies),
+        "mean_ms": round(float(lat_ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(lat_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(lat_ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(lat_ms, 99)), 4),
+        "calls_per_s": round(len(latencies) / total, 2) if total else None,
+        "sentences_per_s": round(units / total, 1) if total else None,
+    }
+
+
+# ------------------ Suites ------------------ #
+# Each builder turns the records of one (lang, size) case into a zero-arg callable.
+
+def build_text(records: List[Dict]) -> Callable[[], int]:
+    it = cycle(records)
+
+    def run():
+        rec = next(it)
+        return len(analyzer.clean_sentences(rec["user_prompt"])) + len(analyzer.clean_sentences(rec["ai_response"]))
+    return run
+
+
+def build_langid(records: List[Dict]) -> Callable[[], int]:
+    it = cycle(records)
+
+    def run():
+        detect_language(next(it)["user_prompt"])
+        return 1
+    return run
+
+
+def build_embeddings(records: List[Dict]) -> Callable[[], int]:
+    it = cycle([analyzer.clean_sentences(r["ai_response"]) for r in records])
+
+    def run():
+        sentences = next(it)
+        analyzer.compute_embeddings(sentences)
+        return len(sentences)
+    return run
+
+
+def build_gaps(records: List[Dict]) -> Callable[[], int]:
+    cases = []
+    for r in records:
+        prompt = analyzer.prepare_prompt(r["user_prompt"], r["output_language"])
+        ai_sentences = analyzer.clean_sentences(r["ai_response"])
+        if not prompt["user_sentences"] or not ai_sentences:
+            continue
+        user_embs, ai_embs = analyzer.compute_embeddings_multi(prompt["user_sentences"], ai_sentences)
+        cases.append((prompt, ai_sentences, user_embs, ai_embs))
+    it = cycle(cases)
+
+    def run():
+        prompt, ai_sentences, user_embs, ai_embs = next(it)
+        cov = score_coverage(user_embs, ai_embs, analyzer.SIM_THRESHOLD)
+        analyzer._detect_gaps(prompt["user_sentences"], cov, prompt["output_language"])
+        analyzer._coverage_field(prompt["user_sentences"], ai_sentences, cov, prompt["user_spans"])
+        return len(prompt["user_sentences"]) * len(ai_sentences)
+    return run
+
+
+def build_e2e(records: List[Dict]) -> Callable[[], int]:
+    it = cycle(records)
+
+    def run():
+        rec = next(it)
+        analyzer.analyze_context_full(rec["user_prompt"], rec["ai_response"], rec["output_language"])
+        return len(analyzer.clean_sentences(rec["ai_response"]))
+    return run
+
+
+SUITES: Dict[str, Callable] = {
+    "text": build_text,
+    "langid": build_langid,
+    "embeddings": build_embeddings,
+    "gaps": build_gaps,
+    "e2e": build_e2e,
+}
+
+
+# ------------------ Baseline diff ------------------ #
+
+def diff_against(baseline: Dict, current: Dict, max_regression: float) -> Tuple[List[str], List[str]]:
+    """
+    Compare p50 latency per case. Returns (report lines, regressed case keys).
+    """
+    lines, regressed = [], []
+    base_results = baseline.get("results", {})
+    for key, cur in current["results"].items():
+        base = base_results.get(key)
+        if not base or not base.get("p50_ms"):
+            continue
+        change = (cur["p50_ms"] - base["p50_ms"]) / base["p50_ms"]
+        flag = ""
+        if change > max_regression:
+            flag = "  REGRESSION"
+            regressed.append(key)
+        elif change < -max_regression:
+            flag = "  improved"
+        lines.append(f"{key:<28}{base['p50_ms']:>12.3f}{cur['p50_ms']:>12.3f}{change * 100:>+9.1f}%{flag}")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", nargs="+", default=list(SUITES), choices=list(SUITES))
+    parser.add_argument("--langs", nargs="+", default=list(LANGS), choices=list(LANGS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                        help="response sentences per pair (prompt gets a quarter)")
+    parser.add_argument("--per-case", type=int, default=4, help="distinct pairs per (lang, size)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per case")
+    parser.add_argument("--min-iters", type=int, default=5)
+    parser.add_argument("--max-iters", type=int, default=500)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write {DEFAULT_BASELINE}")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="allowed p50 slowdown (0.10 = 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    corpus = make_corpus(args.langs, args.sizes, args.per_case, args.seed)
+    cases: Dict[Tuple[str, int], List[Dict]] = {}
+    for rec in corpus:
+        cases.setdefault((rec["lang"], rec["size"]), []).append(rec)
+
+    analyzer.warmup()
+
+    results: Dict[str, Dict] = {}
+    rss: Dict[str, float] = {}
+    for suite in args.suites:
+        for (lang, size), records in cases.items():
+            fn = SUITES[suite](records)
+            fn()  # warm caches / lazy imports for this shape
+            key = f"{suite}/{lang}/{size}"
+            results[key] = measure(fn, args.min_time, args.min_iters, args.max_iters)
+            r = results[key]
+            print(f"{key:<28} p50 {r['p50_ms']:>10.3f} ms  p95 {r['p95_ms']:>10.3f}  p99 {r['p99_ms']:>10.3f}"
+                  f"  {r['calls_per_s']:>9} calls/s  {r['sentences_per_s']:>10} sent/s", flush=True)
+        rss[suite] = peak_rss_mb()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "encoder_backend": analyzer.EMB_BACKEND,
+            "sizes": args.sizes,
+            "langs": args.langs,
+            "per_case": args.per_case,
+            "seed": args.seed,
+        },
+        "results": results,
+        "peak_rss_mb": rss,  # process high-water mark after each suite
+    }
+    print(f"Peak RSS (MB) after each suite: {rss}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressed = diff_against(baseline, report, args.max_regression)
+        print(f"\n{'case':<28}{'base p50':>12}{'now p50':>12}{'change':>10}")
+        print("\n".join(lines))
+        if regressed:
+            print(f"\n{len(regressed)} case(s) slower than baseline by more than {args.max_regression:.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+# Multi-worker serving with shared model weights (see app/serving.py):
+#   gunicorn -c gunicorn.conf.py app.main:app
+import os
+
+from app.serving import configure_worker, preload_shared_models
+
+bind = os.getenv("TOTEM_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("TOTEM_WORKERS", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+
+# Import the app in the master so the weights can be loaded once before fork
+preload_app = True
+
+
+def when_ready(server):
+    preload_shared_models()
+
+
+def post_fork(server, worker):
+    configure_worker(workers)
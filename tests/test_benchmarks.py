@@ -0,0 +1,25 @@
+# tests/test_benchmarks.py
+"""
+Smoke run of every benchmarks.run suite on the fake encoder, so a changed
+analyzer signature breaks here instead of in the next benchmark run.
+"""
+
+import os
+
+os.environ.setdefault("TOTEM_ENCODER_BACKEND", "fake")  # no model download
+os.environ.setdefault("TOTEM_FAKE_ENCODER_BATCH_MS", "0")
+os.environ.setdefault("TOTEM_FAKE_ENCODER_SENTENCE_MS", "0")
+
+import pytest
+
+from benchmarks import run
+
+
+@pytest.mark.parametrize("suite", list(run.SUITES))
+def test_suite_runs(suite, tmp_path):
+    out = tmp_path / "report.json"
+    run.main([
+        "--suites", suite, "--sizes", "3", "--per-case", "1",
+        "--min-time", "0", "--min-iters", "1", "--max-iters", "1", "--out", str(out),
+    ])
+    assert out.exists()
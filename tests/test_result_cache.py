@@ -0,0 +1,82 @@
+# tests/test_result_cache.py
+"""
+/analyze result cache vs. prompt offsets: a cached coverage[].topic_span must
+slice the prompt of the request it is returned for.
+"""
+
+import os
+import unicodedata
+
+os.environ.setdefault("TOTEM_ENCODER_BACKEND", "fake")  # no model download
+os.environ["TOTEM_WARMUP"] = "0"
+os.environ["TOTEM_RESULT_CACHE"] = "memory"
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+PROMPT = "What is photosynthesis? Why do plants need light?"
+ANSWER = "Photosynthesis turns light into chemical energy. Plants use it to make sugar."
+
+
+def _analyze(prompt, **extra):
+    r = client.post("/analyze", json=dict({"user_prompt": prompt, "ai_response": ANSWER}, **extra))
+    assert r.status_code == 200
+    return r
+
+
+def _assert_spans_match(prompt, result):
+    for item in result["coverage"]:
+        start, end = item["topic_span"]
+        written = " ".join(prompt[start:end].split())
+        assert unicodedata.normalize("NFC", written) == unicodedata.normalize("NFC", item["topic"])
+
+
+def test_leading_whitespace_gets_its_own_spans():
+    _analyze(PROMPT)
+    padded = "     " + PROMPT
+    r = _analyze(padded)
+    assert r.headers["X-Cache"] == "MISS"
+    _assert_spans_match(padded, r.json())
+
+
+def test_nfd_prompt_gets_its_own_spans():
+    prompt = "¿Qué es la fotosíntesis? ¿Por qué las plantas necesitan luz?"
+    nfc = unicodedata.normalize("NFC", prompt)
+    nfd = unicodedata.normalize("NFD", prompt)
+    assert nfc != nfd
+    _analyze(nfc)
+    r = _analyze(nfd)
+    assert r.headers["X-Cache"] == "MISS"
+    _assert_spans_match(nfd, r.json())
+
+
+def test_identical_prompt_hits():
+    _analyze(PROMPT + " ")
+    r = _analyze(PROMPT + " ")
+    assert r.headers["X-Cache"] == "HIT"
+    _assert_spans_match(PROMPT + " ", r.json())
+
+
+def test_variants_share_entry_without_coverage():
+    _analyze(PROMPT, fields=["summary"])
+    assert _analyze("  " + PROMPT, fields=["summary"]).headers["X-Cache"] == "HIT"
+
+
+def test_nfd_answer_gets_its_own_echo():
+    answer = "La fotosíntesis convierte la luz en energía química."
+    nfd = unicodedata.normalize("NFD", answer)
+    body = {"user_prompt": PROMPT, "fields": ["improved_answer"]}
+    client.post("/analyze", json=dict(body, ai_response=unicodedata.normalize("NFC", answer)))
+    r = client.post("/analyze", json=dict(body, ai_response=nfd))
+    assert r.headers["X-Cache"] == "MISS"
+    assert nfd in r.json()["improved_answer"]
+
+
+def test_answer_variants_share_entry_without_echo():
+    body = {"user_prompt": PROMPT, "fields": ["improved_answer"], "include_answer": False}
+    client.post("/analyze", json=dict(body, ai_response=ANSWER))
+    r = client.post("/analyze", json=dict(body, ai_response="  " + ANSWER))
+    assert r.headers["X-Cache"] == "HIT"
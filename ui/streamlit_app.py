@@ -1,11 +1,183 @@
 # ui/streamlit_app.py
+import csv
+import hashlib
+import html
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import streamlit as st
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 API_URL = st.sidebar.text_input("Backend URL", value="http://localhost:8000/analyze")
+MODE = st.sidebar.radio("Mode", ["Single pair", "Bulk upload"])
+
+MAX_CONCURRENCY = 32
+# Bulk mode only needs the table columns; the API skips building the rest
+BULK_FIELDS = ["summary", "missing_topics"]
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    One keep-alive HTTP session per server process, shared by reruns and bulk threads.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(show_spinner=False, max_entries=20000)
+def analyze_pair(api_url: str, user_prompt: str, ai_response: str, output_language: str) -> dict:
+    """
+    Cached per input: a rerun (or re-upload) never resends an unchanged pair.
+    Failures raise, so they are not cached.
+    """
+    payload = {
+        "user_prompt": user_prompt,
+        "ai_response": ai_response,
+        "output_language": output_language,
+        "fields": BULK_FIELDS,
+        "include_answer": False,
+    }
+    res = get_session().post(api_url, json=payload, timeout=120)
+    res.raise_for_status()
+    return res.json()
+
+
+def read_pairs(uploaded) -> tuple:
+    """
+    (pairs, problems) from a CSV, JSON (an object or a list of objects) or
+    JSONL/NDJSON upload with user_prompt / ai_response fields (optional:
+    output_language, id). Bad rows are skipped and reported in problems
+    ("line 3: ...") instead of failing the whole file.
+    """
+    text = uploaded.getvalue().decode("utf-8-sig")
+    name = uploaded.name.lower()
+    rows, problems = [], []
+    if name.endswith(".json"):
+        data = json.loads(text)
+        items = data if isinstance(data, list) else [data]
+        rows = [(f"item {i + 1}", r) for i, r in enumerate(items)]
+    elif name.endswith((".jsonl", ".ndjson")):
+        for n, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((f"line {n}", json.loads(line)))
+            except ValueError as e:
+                rows.append((f"line {n}", e))  # reported in file order below
+    else:
+        # header is line 1
+        rows = [(f"line {n}", r) for n, r in enumerate(csv.DictReader(io.StringIO(text)), 2)]
+
+    pairs = []
+    for where, r in rows:
+        if isinstance(r, ValueError):
+            problems.append(f"{where}: invalid JSON ({r})")
+        elif not isinstance(r, dict):
+            problems.append(f"{where}: expected an object, got {type(r).__name__}")
+        elif r.get("user_prompt") is None or r.get("ai_response") is None:
+            problems.append(f"{where}: missing user_prompt or ai_response")
+        else:
+            pairs.append({
+                "id": r.get("id", len(pairs)),
+                "user_prompt": str(r["user_prompt"]),
+                "ai_response": str(r["ai_response"]),
+                "output_language": r.get("output_language") or "auto",
+            })
+    return pairs, problems
+
+
+def table_row(pair: dict, data: dict = None, error: str = None) -> dict:
+    missing = [m["topic"] for m in (data or {}).get("missing_topics", [])]
+    return {
+        "id": pair["id"],
+        "quality_score": data.get("quality_score") if data else None,
+        "missing": len(missing) if data else None,
+        "missing_topics": " | ".join(missing),
+        "language": data.get("detected_user_lang") if data else None,
+        "summary": data.get("summary") if data else None,
+        "user_prompt": pair["user_prompt"],
+        "error": error,
+    }
+
+
+def render_bulk():
+    st.markdown(
+        "Upload a CSV, JSON or JSONL file with `user_prompt` and `ai_response` columns "
+        "(optional: `output_language`, `id`). Results appear as they arrive; click a "
+        "column header to sort."
+    )
+    uploaded = st.file_uploader("Pairs file", type=["csv", "jsonl", "ndjson", "json"])
+    concurrency = st.slider("Parallel requests", 1, MAX_CONCURRENCY, 8)
+    if uploaded is None:
+        return
+    try:
+        pairs, problems = read_pairs(uploaded)
+    except (ValueError, UnicodeDecodeError) as e:
+        st.error(f"Could not read {uploaded.name}: {e}")
+        return
+    st.write(f"{len(pairs)} pairs loaded.")
+    if problems:
+        shown = "\n".join(f"- {p}" for p in problems[:20])
+        more = f"\n- … and {len(problems) - 20} more" if len(problems) > 20 else ""
+        st.warning(f"{len(problems)} rows skipped:\n{shown}{more}")
+    if not pairs:
+        return
+    # Keep showing this file's results on later reruns (sorting, download);
+    # cached pairs come back without new requests
+    file_key = hashlib.sha1(uploaded.getvalue()).hexdigest()
+    if st.button("Analyze all"):
+        st.session_state["bulk_file"] = file_key
+    if st.session_state.get("bulk_file") != file_key:
+        return
+
+    rows = [table_row(p) for p in pairs]
+    progress = st.progress(0.0, text="Starting…")
+    table = st.empty()
+    ctx = get_script_run_ctx()
+
+    def run(pair):
+        return analyze_pair(API_URL, pair["user_prompt"], pair["ai_response"], pair["output_language"])
+
+    done, errors, last_draw = 0, 0, 0.0
+    # Worker threads get the script context so st.cache_data works inside them
+    with ThreadPoolExecutor(concurrency, initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as pool:
+        futures = {pool.submit(run, p): i for i, p in enumerate(pairs)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                rows[i] = table_row(pairs[i], fut.result())
+            except Exception as e:
+                rows[i] = table_row(pairs[i], error=str(e))
+                errors += 1
+            done += 1
+            progress.progress(done / len(pairs), text=f"{done}/{len(pairs)} analyzed, {errors} failed")
+            # Redraw the table at most a few times per second
+            if time.monotonic() - last_draw > 0.3 or done == len(pairs):
+                table.dataframe(rows, use_container_width=True, hide_index=True)
+                last_draw = time.monotonic()
+
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    st.download_button("Download results (CSV)", out.getvalue(), file_name="totem_results.csv", mime="text/csv")
+
 
 st.title("Totem — AI Context Analyzer (Prototype)")
+
+if MODE == "Bulk upload":
+    render_bulk()
+    st.stop()
+
 st.markdown("Enter a user prompt and the AI response. The tool will find gaps and suggest follow-up prompts.")
 
 user_prompt = st.text_area("User Prompt", height=150, placeholder="Enter the user's original prompt here...")
@@ -30,7 +202,7 @@ if st.button("Analyze"):
     else:
         payload = {"user_prompt": user_prompt, "ai_response": ai_response, "output_language": out_lang}
         try:
-            res = requests.post(API_URL, json=payload, timeout=120)
+            res = get_session().post(API_URL, json=payload, timeout=120)
             res.raise_for_status()
             data = res.json()
         except Exception as e:
@@ -54,6 +226,24 @@ if st.button("Analyze"):
                 st.markdown(f"  - Suggestion (EN): {m['suggestion_en']}")
                 st.markdown(f"  - Suggestion (Local): {m.get('suggestion_local','-')}")
 
+        coverage = data.get("coverage") or []
+        if coverage:
+            # Highlight uncovered prompt sentences in place, using their offsets in the prompt
+            st.subheader("Prompt Coverage")
+            parts, pos = [], 0
+            for c in sorted(coverage, key=lambda c: c["topic_span"][0]):
+                start, end = c["topic_span"]
+                parts.append(html.escape(user_prompt[pos:start]))
+                sentence = html.escape(user_prompt[start:end])
+                parts.append(sentence if c["covered"] else f"<mark>{sentence}</mark>")
+                pos = end
+            parts.append(html.escape(user_prompt[pos:]))
+            st.markdown(
+                "<div style='white-space: pre-wrap'>" + "".join(parts) + "</div>",
+                unsafe_allow_html=True,
+            )
+            st.caption("Highlighted: parts of the prompt the answer does not cover.")
+
         st.subheader("Follow-up Prompts")
         for p in data.get("follow_up_prompts", []):
             st.write(f"- {p}")